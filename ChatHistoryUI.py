@@ -16,21 +16,26 @@ SQLite database that LlamaGPT uses.  It supports:
 * **q** or **Ctrl‑C** – quit the application.
 
 Only the four columns ``user_name``, ``is_dm``, ``role`` and ``timestamp`` are
-displayed in the table – the rest of the row is shown in the overlay.
+displayed in the table – the message content is loaded on demand and shown in
+the overlay.
 """
 
 from __future__ import annotations
 
 import asyncio
+import functools
 import os
+import pathlib
 import sqlite3
 import textwrap
-from collections.abc import Iterable
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 
 from prompt_toolkit import Application
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.layout import FormattedTextControl, HSplit, Layout, Window
-from prompt_toolkit.styles import Style
 
 # --------------------------------------------------------------------------- #
 # Configuration – path to the chat‑history database
@@ -42,56 +47,358 @@ if not os.path.exists(DB_PATH):
 # Keep a reference to the original sqlite3.connect() before any monkey‑patching
 _ORIG_SQLITE_CONNECT = sqlite3.connect
 
+# How often (seconds) the watcher thread checks the database for new commits,
+# and how long the refresh task waits after a change so bursts coalesce.
+_WATCH_INTERVAL = 0.1
+_REFRESH_DEBOUNCE = 0.05
+
+# Minimum time between two screen redraws (~60 fps).  Invalidations arriving
+# faster – e.g. from a held-down arrow key – are coalesced into one render.
+_MIN_REDRAW_INTERVAL = 1 / 60
+
+
+def _connect_read_only() -> sqlite3.Connection:
+    """Open a read-only connection to the database."""
+    uri = pathlib.Path(DB_PATH).resolve().as_uri() + "?mode=ro"
+    return _ORIG_SQLITE_CONNECT(
+        uri, uri=True, check_same_thread=False, isolation_level=None
+    )
+
+
+# Single worker thread for database work issued while the UI is running, so
+# SQLite calls never stall the prompt_toolkit event loop.  One worker keeps
+# every statement on the shared connections serialized.
+_DB_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-db")
+
+# Maximum number of rows shown in the table
+_ROW_LIMIT = 100
+
+# Columns the table can be sorted on (the visible ones)
+_SORTABLE_COLS = ("user_name", "is_dm", "role", "timestamp")
+
+# Width of a table cell; longer text columns are truncated by SQLite.
+_CELL_WIDTH = 30
+
+# Columns fetched for the table.  ``content`` is left out – it can be large
+# and is only needed by the overlay, which loads it on demand.  Text columns
+# arrive already cut to the cell width, and the bot's epoch‑nanosecond
+# timestamps already formatted as UTC date and time, so Python never
+# reformats them.
+_LIST_COLS = (
+    "id, user_id,"
+    f" substr(user_name, 1, {_CELL_WIDTH}) AS user_name,"
+    " channel_id, is_dm,"
+    f" substr(role, 1, {_CELL_WIDTH}) AS role,"
+    " CASE typeof(timestamp) WHEN 'integer' THEN"
+    " strftime('%Y-%m-%d %H:%M:%S', timestamp / 1000000000, 'unixepoch')"
+    " ELSE timestamp END AS timestamp"
+)
+
+# Every ``SELECT`` the UI issues, keyed by ``(order_by, descending,
+# incremental)``.  Building them once whitelists the sort column and keeps the
+# SQL text identical between calls, so sqlite3's statement cache always hits.
+#
+# The last column, ``sort_key``, is the raw value of the sort column: the
+# displayed one may be truncated or formatted, so only the raw value lets
+# ``_merge_rows`` reproduce the database order.  The id breaks ties in the
+# same direction, which makes that order total.
+_QUERIES: dict[tuple[str, bool, bool], str] = {
+    (col, desc, incremental): (
+        f"SELECT {_LIST_COLS}, messages.{col} AS sort_key FROM messages"
+        f"{' WHERE id > ?' if incremental else ''}"
+        # Qualify the columns so ORDER BY uses the indexed table columns
+        # rather than the result columns of the same name.
+        f" ORDER BY messages.{col} {direction}, messages.id {direction}"
+        f" LIMIT {_ROW_LIMIT}"
+    )
+    for col in _SORTABLE_COLS
+    for desc, direction in ((True, "DESC"), (False, "ASC"))
+    for incremental in (False, True)
+}
+
+
+def _open_connections() -> tuple[sqlite3.Connection, sqlite3.Connection]:
+    """
+    Open the writer and the read-only connection to :data:`DB_PATH`.
+
+    The schema, including an index for every sortable column, belongs to the
+    bot (``LlamaGPT.init_db``); the viewer never changes it.
+    """
+    write_conn = _ORIG_SQLITE_CONNECT(
+        DB_PATH, check_same_thread=False, isolation_level=None
+    )
+    write_conn.execute("PRAGMA journal_mode=WAL")
+    write_conn.execute("PRAGMA synchronous=NORMAL")
+    # Wait for a bot commit in progress instead of failing with "locked"
+    write_conn.execute("PRAGMA busy_timeout=5000")
+
+    read_conn = _connect_read_only()
+    read_conn.execute("PRAGMA query_only=1")
+    read_conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    read_conn.execute("PRAGMA cache_size=-8000")  # ~8 MiB
+    return write_conn, read_conn
+
+
+# Two connections live for the lifetime of the UI: a writer used only for
+# deletes and a read-only one for every query.  Reusing them (and identical
+# SQL strings) lets sqlite3's statement cache skip re-parsing on every
+# refresh and keystroke.  WAL lets the reader run alongside the bot's writes.
+_WRITE_CONN, _READ_CONN = _open_connections()
+
 
 # --------------------------------------------------------------------------- #
 # Helpers
 # --------------------------------------------------------------------------- #
 def _query(
-    order_by: str | None = None, descending: bool = True
+    order_by: str | None = None,
+    descending: bool = True,
+    after_id: int | None = None,
 ) -> tuple[list[str], list[tuple]]:
     """
-    Execute ``SELECT * FROM messages`` on the database, optionally sorted.
+    Fetch the table rows (every column except ``content``), optionally sorted.
 
     Parameters
     ----------
     order_by:
-        The column name to sort by.  If ``None`` the column ``timestamp`` is used.
+        The column name to sort by; must be one of the visible columns.  If
+        ``None`` the column ``timestamp`` is used.
     descending:
         Whether the order should be descending (``True``) or ascending
         (``False``).
+    after_id:
+        If given, only rows whose ``id`` is greater than this value are
+        returned.
 
     Returns
     -------
     tuple
         ``(column_names, rows)`` where *column_names* is a list of strings
         and *rows* is a list of tuples, each tuple containing a database row.
+        The last column is ``sort_key``, the raw value the rows are sorted on.
+
+    Raises
+    ------
+    ValueError
+        If *order_by* is not a sortable column.
     """
-    column = order_by or "timestamp"
-    order_clause = f" ORDER BY {column} {'DESC' if descending else 'ASC'}"
-
-    with _ORIG_SQLITE_CONNECT(DB_PATH) as conn:
-        cur = conn.cursor()
-        cur.execute(f"SELECT * FROM messages{order_clause} LIMIT 100")
-        cols = [d[0] for d in cur.description]
-        rows = cur.fetchall()
+    try:
+        sql = _QUERIES[(order_by or "timestamp", descending, after_id is not None)]
+    except KeyError:
+        raise ValueError(f"Cannot sort by column {order_by!r}") from None
+
+    cur = _READ_CONN.execute(sql, () if after_id is None else (after_id,))
+    cols = [d[0] for d in cur.description]
+    rows = cur.fetchall()
     return cols, rows
 
 
+def _fetch_content(row_id: int) -> str | None:
+    """Return the ``content`` of the message with primary key *row_id*."""
+    row = _READ_CONN.execute(
+        "SELECT content FROM messages WHERE id=?", (row_id,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def _data_version() -> int:
+    """
+    Return ``PRAGMA data_version`` of the read connection.
+
+    The value changes whenever another connection – the bot or the UI's own
+    writer – commits to the database.
+    """
+    return _READ_CONN.execute("PRAGMA data_version").fetchone()[0]
+
+
+def _max_id() -> int:
+    """Return the largest ``id`` in the table (``0`` when it is empty)."""
+    return _READ_CONN.execute("SELECT MAX(id) FROM messages").fetchone()[0] or 0
+
+
+def _row_changes(after_id: int, row_ids: list[int]) -> tuple[int, int, int]:
+    """
+    Return ``(max_id, new_count, missing)``.
+
+    *max_id* and *new_count* are the largest ``id`` above *after_id* (or
+    *after_id* itself) and the number of such rows; *missing* counts the ids
+    in *row_ids* that are no longer in the table.  Both statements are
+    primary key lookups, so the cost follows the number of new and given
+    rows, not the size of the table.
+    """
+    max_id, new_count = _READ_CONN.execute(
+        "SELECT COALESCE(MAX(id), ?), COUNT(*) FROM messages WHERE id > ?",
+        (after_id, after_id),
+    ).fetchone()
+    present = 0
+    if row_ids:
+        marks = ",".join("?" * len(row_ids))
+        (present,) = _READ_CONN.execute(
+            f"SELECT COUNT(*) FROM messages WHERE id IN ({marks})", row_ids
+        ).fetchone()
+    return max_id, new_count, len(row_ids) - present
+
+
+def _delete_message(row_id: int) -> tuple[int, int]:
+    """
+    Delete the message with primary key *row_id*.
+
+    Returns the data version just before and just after the delete, so the
+    caller can tell whether anything else was committed in between.
+    """
+    before = _data_version()
+    _WRITE_CONN.execute("DELETE FROM messages WHERE id=?", (row_id,))
+    return before, _data_version()
+
+
+def _row_order(row: tuple) -> tuple:
+    """
+    Return the key that sorts *row* the way :func:`_query` orders it.
+
+    SQLite compares the ``sort_key`` column (the last one) by storage class
+    first – ``NULL``, then numbers, then text, then blobs – and the id breaks
+    ties.
+    """
+    value = row[-1]
+    if value is None:
+        rank = 0
+    elif isinstance(value, (int, float)):
+        rank = 1
+    elif isinstance(value, str):
+        rank = 2
+    else:
+        rank = 3
+    return rank, value, row[0]
+
+
+def _merge_rows(
+    rows: list[tuple], new_rows: list[tuple], descending: bool
+) -> list[tuple]:
+    """
+    Merge freshly inserted *new_rows* into the already sorted *rows*.
+
+    Both lists come from :func:`_query` with the same sort column, and rows
+    present in both are taken from *new_rows*.  The result is in the order a
+    full :func:`_query` returns and is truncated to the table's row limit.
+    """
+    new_ids = {row[0] for row in new_rows}
+    merged = new_rows + [row for row in rows if row[0] not in new_ids]
+    merged.sort(key=_row_order, reverse=descending)
+    return merged[:_ROW_LIMIT]
+
+
+async def _run_db(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking database call on the database worker thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _DB_EXECUTOR, functools.partial(func, *args, **kwargs)
+    )
+
+
+def _watch_data_version(
+    ui: "TableUI", loop: asyncio.AbstractEventLoop, stop: threading.Event
+) -> None:
+    """
+    Poll ``PRAGMA data_version`` on a dedicated connection and mark the UI as
+    dirty whenever another connection (e.g. the bot) commits to the database.
+
+    The pragma is answered from the connection state without touching the
+    table, so idle polling costs next to nothing.  Runs in a worker thread.
+    """
+    conn = _connect_read_only()
+    try:
+        last = conn.execute("PRAGMA data_version").fetchone()[0]
+        while not stop.wait(_WATCH_INTERVAL):
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != last:
+                last = version
+                loop.call_soon_threadsafe(ui._dirty.set)
+    finally:
+        conn.close()
+
+
 async def _periodic_refresh(ui: "TableUI") -> None:
     """
-    Periodically reload the database every second to keep the UI up‑to‑date.
+    Reload the database whenever the UI is flagged as dirty.
     """
     while True:
-        await asyncio.sleep(1)
-        cols, rows = _query(order_by=ui.sort_col, descending=ui.sort_descending)
-        if rows != ui.rows or cols != ui.cols:
-            ui.cols, ui.rows = cols, rows
-            ui.app.invalidate()
+        await ui._dirty.wait()
+        # Give a burst of writes a moment to settle before reloading.
+        await asyncio.sleep(_REFRESH_DEBOUNCE)
+        ui._dirty.clear()
+
+        # The watcher also fires for the UI's own deletes, which were already
+        # applied to ``ui.rows``; nothing else changed if the version did not.
+        baseline = ui._last_data_version
+        version = await _run_db(_data_version)
+        if version == baseline:
+            continue
+        # ``None`` marks a table that no longer matches the database (see the
+        # ``x`` key binding); only a full reload can repair it.
+        stale = baseline is None
+
+        # AUTOINCREMENT ids only grow, so rows above the last MAX(id) are new
+        # and only those need fetching – provided every row on screen is still
+        # there.  Rows that are not shown cannot change the top of the table by
+        # going away.  Anything else (a shown row deleted, an update) falls
+        # back to a full reload.
+        sort_col, descending = ui.sort_col, ui.sort_descending
+        row_ids = [row[0] for row in ui.rows]
+        max_id, new_count, missing = await _run_db(
+            _row_changes, ui._last_max_id, row_ids
+        )
+        if new_count and not missing and not stale:
+            cols, new_rows = await _run_db(
+                _query,
+                order_by=sort_col,
+                descending=descending,
+                after_id=ui._last_max_id,
+            )
+            rows = _merge_rows(ui.rows, new_rows, descending)
+        else:
+            cols, rows = await _run_db(_query, order_by=sort_col, descending=descending)
+
+        # A sort key press while the query ran has already reloaded the table.
+        if (sort_col, descending) != (ui.sort_col, ui.sort_descending):
+            continue
+        ui.cols, ui.rows = cols, rows
+        ui._last_max_id = max_id
+        # A delete that finished meanwhile may have moved the baseline – past
+        # its own commit, or to ``None`` because it failed.  Keep its value,
+        # so a failed delete still gets the full reload that restores its row.
+        if ui._last_data_version == baseline:
+            ui._last_data_version = version
+        ui.app.invalidate()
 
 
 # --------------------------------------------------------------------------- #
 # UI
 # --------------------------------------------------------------------------- #
+class _SizedTextControl(FormattedTextControl):
+    """
+    A ``FormattedTextControl`` that reports the size it is laid out at.
+
+    prompt_toolkit already tracks the terminal size (it listens for
+    ``SIGWINCH``), so the body learns its dimensions from the layout pass
+    instead of querying the terminal on every redraw.  *on_size* is called
+    with ``(width, height)`` before the text is rendered.
+
+    The window showing it must ignore the content height: otherwise the
+    layout renders the text while measuring it, before the size is known,
+    and prompt_toolkit reuses that text for the rest of the frame.
+    """
+
+    def __init__(self, on_size: Callable[[int, int], None], **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._on_size = on_size
+        self._size: tuple[int, int] | None = None
+
+    def create_content(self, width: int, height: int | None) -> Any:
+        if height is not None and (width, height) != self._size:
+            self._size = (width, height)
+            self._on_size(width, height)
+        return super().create_content(width, height)
+
+
 class TableUI:
     """
     Main application class – a thin wrapper around a prompt_toolkit ``Application``.
@@ -99,7 +406,8 @@ class TableUI:
 
     # The columns that are shown in the table; everything else is displayed
     # only in the overlay.
-    _VISIBLE_COLS = ("user_name", "is_dm", "role", "timestamp")
+    _VISIBLE_COLS = _SORTABLE_COLS
+    _HEADER_CELLS = tuple(f" {col} " for col in _VISIBLE_COLS)
 
     def __init__(self) -> None:
         # ------------------------------------------------------------------ #
@@ -109,9 +417,16 @@ class TableUI:
         self.last_sort_col: str | None = None  # last sorted column
         self.sort_descending: bool = True  # sort direction
 
+        # Ids of the rows deleted with ``x``.  AUTOINCREMENT never reuses an
+        # id, so they can be filtered out of every later result – including a
+        # query that read the database before the delete was committed.
+        self._deleted_ids: set[int] = set()
+
         # ------------------------------------------------------------------ #
         # Initial data load
         # ------------------------------------------------------------------ #
+        self._last_max_id = _max_id()  # newest row id already loaded
+        self._last_data_version = _data_version()  # DB version already loaded
         self.cols, self.rows = _query(
             order_by=self.sort_col, descending=self.sort_descending
         )
@@ -127,6 +442,14 @@ class TableUI:
         # ------------------------------------------------------------------ #
         self.overlay_content: str | None = None
         self.overlay_offset: int = 0  # line offset for scrolling
+        # Wrapped overlay lines, memoized per ``(content, width)``
+        self._overlay_key: tuple[str, int] | None = None
+        self._overlay_wrapped: list[str] = []
+
+        # ------------------------------------------------------------------ #
+        # Change notification – set when the database has been written to
+        # ------------------------------------------------------------------ #
+        self._dirty = asyncio.Event()
 
         # ------------------------------------------------------------------ #
         # Layout helpers
@@ -134,12 +457,20 @@ class TableUI:
         self._refresh_dimensions()
 
         self.header_control = FormattedTextControl(text=self._render_header)
-        self.body_control = FormattedTextControl(text=self._render_body)
+        self.body_control = _SizedTextControl(
+            on_size=self._set_body_size, text=self._render_body
+        )
 
         self.header_win = Window(
             content=self.header_control, height=1, style="reverse bold"
         )
-        self.body_win = Window(content=self.body_control, always_hide_cursor=True)
+        # The body fills whatever the header leaves, so its content height is
+        # never needed – and measuring it would render the body too early.
+        self.body_win = Window(
+            content=self.body_control,
+            always_hide_cursor=True,
+            ignore_content_height=True,
+        )
 
         # ------------------------------------------------------------------ #
         # Key bindings
@@ -155,13 +486,59 @@ class TableUI:
             key_bindings=self.kb,
             full_screen=True,
             mouse_support=False,
+            min_redraw_interval=_MIN_REDRAW_INTERVAL,
+        )
+
+    # ----------------------------------------------------------------------- #
+    # Column bookkeeping
+    # ----------------------------------------------------------------------- #
+    @property
+    def cols(self) -> list[str]:
+        """Column names of the rows in :attr:`rows`."""
+        return self._cols
+
+    @cols.setter
+    def cols(self, value: list[str]) -> None:
+        # Every refresh re-assigns the same column list; only a real change
+        # needs the derived state (and the display cells) rebuilt.
+        if value == getattr(self, "_cols", None):
+            return
+
+        # Resolve the positions of the visible columns once per assignment
+        # rather than on every redraw.
+        self._cols = value
+        self._visible_idx = tuple(value.index(c) for c in self._VISIBLE_COLS)
+        self._row_lines: dict[tuple, tuple[str, str]] = {}
+        if hasattr(self, "_rows"):
+            self.rows = self._rows
+
+    @property
+    def rows(self) -> list[tuple]:
+        """
+        The table rows as fetched from the database.
+
+        Assign a new list rather than mutating this one in place – the
+        display cells are derived from it on assignment.
+        """
+        return self._rows
+
+    @rows.setter
+    def rows(self, value: list[tuple]) -> None:
+        # Transpose the visible columns into one list of pre-formatted cells
+        # per column, so a redraw only indexes strings instead of formatting
+        # every value again.  ``_query`` has already truncated long text.
+        if self._deleted_ids:
+            value = [row for row in value if row[0] not in self._deleted_ids]
+        self._rows = value
+        self._display = tuple(
+            [f" {row[i]!s:{_CELL_WIDTH}} " for row in value] for i in self._visible_idx
         )
 
     # ----------------------------------------------------------------------- #
     # Terminal size helpers
     # ----------------------------------------------------------------------- #
     def _refresh_dimensions(self) -> None:
-        """Cache the current terminal height and width."""
+        """Cache the initial terminal height and width."""
         try:
             size = os.get_terminal_size()
             self.body_height = size.lines - 1  # one line is used by the header
@@ -171,144 +548,179 @@ class TableUI:
             self.body_height = 23
             self.body_width = 80
 
+    def _set_body_size(self, width: int, height: int) -> None:
+        """Record the body size reported by the layout."""
+        self.body_width = width
+        self.body_height = height
+
     # ----------------------------------------------------------------------- #
     # Rendering
     # ----------------------------------------------------------------------- #
+    def _overlay_lines(self) -> list[str]:
+        """
+        Return the overlay content wrapped to the terminal width.
+
+        Wrapping is only redone when the content or the width changes, not on
+        every redraw or scroll.  Blank lines are kept as empty strings.
+        """
+        key = (self.overlay_content, self.body_width)
+        if key != self._overlay_key:
+            self._overlay_key = key
+            self._overlay_wrapped = [
+                line
+                for raw in self.overlay_content.splitlines()
+                for line in textwrap.wrap(raw, width=self.body_width) or [""]
+            ]
+        return self._overlay_wrapped
+
     def _render_header(self) -> Iterable[tuple[str, str]]:
         """Return a sequence of ``(style, text)`` tuples for the header row."""
-        parts: list[tuple[str, str]] = []
-
-        # ``self._VISIBLE_COLS`` already gives the order we want to display.
-        for idx, col in enumerate(self._VISIBLE_COLS):
-            # Highlight the column header that is currently selected.
-            style = "" if idx == self.selected_col else "reverse bold"
-            parts.append((style, f" {col} "))
-
-        return parts
+        # Highlight the column header that is currently selected.
+        return [
+            ("" if idx == self.selected_col else "reverse bold", cell)
+            for idx, cell in enumerate(self._HEADER_CELLS)
+        ]
 
     def _render_body(self) -> Iterable[tuple[str, str]]:
         """Return a sequence of ``(style, text)`` tuples for the body."""
-        self._refresh_dimensions()
-
         # ------------------------------------------------------------------ #
         # Overlay mode – show the full message content
         # ------------------------------------------------------------------ #
         if self.overlay_content is not None:
-            raw_lines = self.overlay_content.splitlines()
-            wrapped = [
-                line
-                for raw in raw_lines
-                for line in textwrap.wrap(raw, width=self.body_width)
-            ]
-
+            wrapped = self._overlay_lines()
             start = self.overlay_offset
             end = min(start + self.body_height, len(wrapped))
             return [("", line + "\n") for line in wrapped[start:end]]
 
         # ------------------------------------------------------------------ #
-        # Table mode – show the visible columns for each row
+        # Table mode – one fragment per row, except that the selected row is
+        # split around its highlighted cell.  Fragments of unselected rows
+        # are reused from the previous frame when the row did not change, so
+        # only rows that were edited or changed highlight are re-formatted.
         # ------------------------------------------------------------------ #
-        visible_idx = [self.cols.index(c) for c in self._VISIBLE_COLS]
         result: list[tuple[str, str]] = []
+        sel = self.selected_col
+        display = self._display
+        prev_lines = self._row_lines
+        lines: dict[tuple, tuple[str, str]] = {}
 
         for r_idx, row in enumerate(self.rows):
-            for c_idx, col_idx in enumerate(visible_idx):
-                val = row[col_idx]
-                style = (
-                    "reverse"
-                    if r_idx == self.selected_row and c_idx == self.selected_col
-                    else ""
-                )
-                # Truncate long values to keep the table tidy
-                display = f" {str(val)[:30]:30} "
-                result.append((style, display))
-            result.append(("", "\n"))
-
+            if r_idx != self.selected_row:
+                frag = prev_lines.get(row)
+                if frag is None:
+                    frag = ("", "".join(col[r_idx] for col in display) + "\n")
+                lines[row] = frag
+                result.append(frag)
+                continue
+
+            cells = [col[r_idx] for col in display]
+            if sel:
+                result.append(("", "".join(cells[:sel])))
+            result.append(("reverse", cells[sel]))
+            result.append(("", "".join(cells[sel + 1 :]) + "\n"))
+
+        self._row_lines = lines
         return result
 
     # ----------------------------------------------------------------------- #
     # Key bindings
     # ----------------------------------------------------------------------- #
     def _bind_keys(self) -> None:
+        # The movement handlers only invalidate when the selection or scroll
+        # position actually changed, so key repeats at an edge cost nothing.
         @self.kb.add("left")
         def _move_left(event) -> None:
-            if self.overlay_content is None:
-                self.selected_col = max(0, self.selected_col - 1)
+            if self.overlay_content is None and self.selected_col > 0:
+                self.selected_col -= 1
                 event.app.invalidate()
 
         @self.kb.add("right")
         def _move_right(event) -> None:
-            if self.overlay_content is None:
-                self.selected_col = min(
-                    len(self._VISIBLE_COLS) - 1, self.selected_col + 1
-                )
+            if (
+                self.overlay_content is None
+                and self.selected_col < len(self._VISIBLE_COLS) - 1
+            ):
+                self.selected_col += 1
                 event.app.invalidate()
 
         @self.kb.add("up")
         def _move_up(event) -> None:
             if self.overlay_content is None:
-                self.selected_row = max(0, self.selected_row - 1)
+                if self.selected_row <= 0:
+                    return
+                self.selected_row -= 1
             else:
-                self.overlay_offset = max(0, self.overlay_offset - 1)
+                if self.overlay_offset <= 0:
+                    return
+                self.overlay_offset -= 1
             event.app.invalidate()
 
         @self.kb.add("down")
         def _move_down(event) -> None:
             if self.overlay_content is None:
-                self.selected_row = min(len(self.rows) - 1, self.selected_row + 1)
+                if self.selected_row >= len(self.rows) - 1:
+                    return
+                self.selected_row += 1
             else:
-                # Compute the maximum offset for scrolling
-                raw_lines = self.overlay_content.splitlines()
-                wrapped = [
-                    line
-                    for raw in raw_lines
-                    for line in textwrap.wrap(raw, width=self.body_width)
-                ]
-                max_offset = max(0, len(wrapped) - self.body_height)
-                self.overlay_offset = min(max_offset, self.overlay_offset + 1)
+                max_offset = max(0, len(self._overlay_lines()) - self.body_height)
+                if self.overlay_offset >= max_offset:
+                    return
+                self.overlay_offset += 1
             event.app.invalidate()
 
+        # The handlers below that need the database are coroutines, which
+        # prompt_toolkit runs as background tasks: the worker may be busy,
+        # e.g. with a delete waiting for the bot's write lock, and the UI must
+        # not freeze meanwhile.
         @self.kb.add("space")
         @self.kb.add(" ")
-        def _toggle_overlay(event) -> None:
+        async def _toggle_overlay(event) -> None:
             if self.overlay_content is None:
-                # Column index 6 holds the message content in the database schema
-                self.overlay_content = str(self.rows[self.selected_row][6])
+                # The table rows omit ``content``; load it for this row only.
+                row_id = self.rows[self.selected_row][0]
+                content = await _run_db(_fetch_content, row_id)
+                self.overlay_content = str(content)
                 self.overlay_offset = 0
             else:
                 self.overlay_content = None
             event.app.invalidate()
 
         @self.kb.add("x")
-        def _delete_row(event) -> None:
+        async def _delete_row(event) -> None:
             if self.overlay_content is not None:
                 return
 
-            # Identify the row to delete by its primary key.
+            # Column 0 is the primary key, already fetched by ``_query``.
             row = self.rows[self.selected_row]
-            with _ORIG_SQLITE_CONNECT(DB_PATH) as conn:
-                cur = conn.cursor()
-                cur.execute(
-                    """
-                    SELECT id FROM messages
-                    WHERE user_id=? AND user_name=? AND channel_id=?
-                    AND is_dm=? AND role=? AND content=? AND timestamp=?
-                    """,
-                    (row[1], row[2], row[3], row[4], row[5], row[6], row[7]),
-                )
-                result = cur.fetchone()
-                if result:
-                    conn.execute("DELETE FROM messages WHERE id=?", (result[0],))
-                    conn.commit()
+            self._deleted_ids.add(row[0])
 
             # Remove the row from the in‑memory list
-            del self.rows[self.selected_row]
+            self.rows = (
+                self.rows[: self.selected_row] + self.rows[self.selected_row + 1 :]
+            )
             if self.selected_row >= len(self.rows):
                 self.selected_row = max(0, len(self.rows) - 1)
             event.app.invalidate()
 
+            # The outcome is applied here on the event loop, like every other
+            # baseline change.
+            try:
+                before, after = await _run_db(_delete_message, row[0])
+            except sqlite3.Error:
+                # The row is still stored (e.g. the database stayed locked):
+                # show it again and mark the table stale so the refresh task
+                # reloads it.
+                self._deleted_ids.discard(row[0])
+                self._last_data_version = None
+                self._dirty.set()
+                return
+            # If the table was up to date before the delete, advance its
+            # baseline past this commit so the refresh task skips it.
+            if before == self._last_data_version:
+                self._last_data_version = after
+
         @self.kb.add("t")
-        def _sort_column(event) -> None:
+        async def _sort_column(event) -> None:
             col_name = self._VISIBLE_COLS[self.selected_col]
             self.sort_col = col_name
 
@@ -318,9 +730,14 @@ class TableUI:
                 self.sort_descending = True
             self.last_sort_col = col_name
 
-            self.cols, self.rows = _query(
-                order_by=col_name, descending=self.sort_descending
-            )
+            descending = self.sort_descending
+            max_id = await _run_db(_max_id)
+            cols, rows = await _run_db(_query, order_by=col_name, descending=descending)
+            # A later ``t`` press has already asked for another order.
+            if (col_name, descending) != (self.sort_col, self.sort_descending):
+                return
+            self._last_max_id = max_id
+            self.cols, self.rows = cols, rows
             self.selected_row = 0
             event.app.invalidate()
 
@@ -336,8 +753,19 @@ class TableUI:
         """Start the UI."""
 
         async def _start() -> None:
+            stop = threading.Event()
+            watcher = threading.Thread(
+                target=_watch_data_version,
+                args=(self, asyncio.get_running_loop(), stop),
+                daemon=True,
+            )
+            watcher.start()
             self.app.create_background_task(_periodic_refresh(self))
-            await self.app.run_async()
+            try:
+                await self.app.run_async()
+            finally:
+                stop.set()
+                watcher.join()
 
         asyncio.run(_start())
 
@@ -6,6 +6,8 @@ Features
 --------
 * Prints the model’s “thinking” text before the final reply.
 * Responds to private whispers (DMs).
+* Streams replies, sending each Discord‑sized chunk as soon as it is
+  generated.
 * Persists every chat exchange in an SQLite database for persistence
   across restarts and easy querying.
 """
@@ -13,15 +15,22 @@ Features
 # --------------------------------------------------------------------------- #
 # Imports
 # --------------------------------------------------------------------------- #
+import asyncio
 import atexit
-import datetime
+import functools
+import itertools
 import os
+import re
 import sqlite3
-from collections import defaultdict, deque
-from typing import Any, Dict, Iterable, List, Tuple, Union
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterable, List, Tuple
 
 import aiohttp
 import discord
+import orjson
 from discord import Client, Intents, Message
 
 # --------------------------------------------------------------------------- #
@@ -31,30 +40,59 @@ DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")  # Required
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api")
 MODEL_NAME = os.getenv("OLLAMA_MODEL", "gpt-oss:20B")
 
-# SQLite database that holds the chat history
-DB_PATH = "chat_history.db"
+# SQLite database that holds the chat history (ChatHistoryUI reads the same
+# variable)
+DB_PATH = os.getenv("CHAT_HISTORY_DB", "chat_history.db")
+
+# Ollama can take a while to answer on large models, and a streamed answer
+# may run for minutes, so there is no cap on the whole request – only on
+# connecting and on the silence between two received pieces.
+OLLAMA_CONNECT_TIMEOUT = 10  # seconds
+OLLAMA_READ_TIMEOUT = 300  # seconds without any data (e.g. loading the model)
+OLLAMA_TIMEOUT = aiohttp.ClientTimeout(
+    total=None, sock_connect=OLLAMA_CONNECT_TIMEOUT, sock_read=OLLAMA_READ_TIMEOUT
+)
 
 
 # --------------------------------------------------------------------------- #
 # 2. Helper: split a string into Discord‑friendly chunks (≤ 2000 chars)
 # --------------------------------------------------------------------------- #
-def chunk_text(text: str, limit: int = 2000) -> List[str]:
+# Maximum length of a single Discord message
+DISCORD_MAX_CHARS = 2000
+_NON_SPACE = re.compile(r"\S")
+
+
+def chunk_text(text: str, limit: int = DISCORD_MAX_CHARS) -> List[str]:
     """
     Split *text* into a list of strings each no longer than *limit* characters.
     Splits on the last space before *limit* to avoid breaking words.
+
+    Works on an offset into *text* so only the emitted chunks are copied,
+    keeping long replies linear rather than quadratic.  Each step is a
+    C-level scan (``str.rfind`` / ``re.search``), so the Python loop runs
+    once per chunk, not once per character.
     """
+    n = len(text)
+    if n <= limit:  # Fast path: most replies fit in a single message
+        return [text] if text else []
+
     parts: List[str] = []
-    while text:
-        if len(text) <= limit:
-            parts.append(text)
+    pos = 0
+    while pos < n:
+        if n - pos <= limit:
+            parts.append(text[pos:])
             break
 
-        cut = text.rfind(" ", 0, limit)
+        end = pos + limit
+        cut = text.rfind(" ", pos, end)
         if cut == -1:  # No space found → hard cut
-            cut = limit
+            cut = end
 
-        parts.append(text[:cut].rstrip())
-        text = text[cut:].lstrip()
+        parts.append(text[pos:cut].rstrip())
+
+        # Skip the whitespace the next chunk would otherwise start with
+        match = _NON_SPACE.search(text, cut)
+        pos = match.start() if match else n
 
     return parts
 
@@ -62,33 +100,174 @@ def chunk_text(text: str, limit: int = 2000) -> List[str]:
 # --------------------------------------------------------------------------- #
 # 3. Database helpers
 # --------------------------------------------------------------------------- #
-def init_db() -> sqlite3.Connection:
+_INDICES = {
+    "idx_messages_ts": "timestamp DESC, id DESC",
+    "idx_messages_channel_ts": "channel_id, timestamp DESC, id DESC",
+    "idx_messages_user_ts": "user_id, timestamp DESC, id DESC",
+    # The other columns ChatHistoryUI sorts on; ``idx_messages_ts`` serves
+    # its timestamp order as well.
+    "idx_messages_user_name": "user_name",
+    "idx_messages_is_dm": "is_dm",
+    "idx_messages_role": "role",
+}
+
+_MESSAGES_COLUMNS = "id, user_id, user_name, channel_id, is_dm, role, content"
+
+_CREATE_MESSAGES_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id     INTEGER,
+        user_name   TEXT,
+        channel_id  INTEGER,
+        is_dm       INTEGER,
+        role        TEXT,
+        content     TEXT,
+        timestamp   INTEGER
+    )
+"""
+
+
+def _migrate_text_timestamps(conn: sqlite3.Connection) -> None:
     """
-    Create the SQLite file and table if they do not exist.
-    Returns a connection object that stays open for the lifetime of the bot.
+    Convert a ``messages`` table from before integer timestamps.
+
+    Such tables declare ``timestamp TEXT`` and hold ISO‑8601 UTC strings.
+    SQLite sorts every INTEGER below every TEXT, and the TEXT affinity would
+    store new nanosecond values as text too, so the table is rebuilt with an
+    INTEGER column and the old values converted to epoch nanoseconds
+    (millisecond precision).  Does nothing on an up‑to‑date table.
     """
+    types = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(messages)")}
+    if types.get("timestamp", "").upper() != "TEXT":
+        return
+
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")  # make the DDL part of the transaction
+        conn.execute("DROP TABLE IF EXISTS messages_migrated")
+        conn.execute(_CREATE_MESSAGES_SQL.format(table="messages_migrated"))
+        # Values julianday() cannot parse (e.g. nanoseconds already stored as
+        # text) are copied as-is; the INTEGER affinity turns numbers back
+        # into integers.
+        conn.execute(
+            f"""
+            INSERT INTO messages_migrated ({_MESSAGES_COLUMNS}, timestamp)
+            SELECT {_MESSAGES_COLUMNS},
+                CASE WHEN julianday(timestamp) IS NULL THEN timestamp
+                ELSE CAST(
+                    ROUND((julianday(timestamp) - 2440587.5) * 86400000)
+                    AS INTEGER
+                ) * 1000000
+                END
+            FROM messages
+            """
+        )
+        conn.execute("DROP TABLE messages")
+        conn.execute("ALTER TABLE messages_migrated RENAME TO messages")
+
+
+def _connect() -> sqlite3.Connection:
+    """Open and tune a connection to ``DB_PATH``, without touching the schema."""
     conn = sqlite3.connect(
         DB_PATH,
         detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+        uri=True,  # plain paths still work; lets tests pass ``file:`` URIs
+        check_same_thread=False,  # writes run on _DB_EXECUTOR, see _DB_LOCK
+        # Keep the prepared INSERT (one per batch size) and the
+        # fetch_recent_messages variants compiled between calls.
+        cached_statements=128,
     )
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS messages (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id     INTEGER,
-            user_name   TEXT,
-            channel_id  INTEGER,
-            is_dm       INTEGER,
-            role        TEXT,
-            content     TEXT,
-            timestamp   TEXT
-        )
-        """
-    )
+    # Rows can be read by column name (``row["content"]``) or by position
+    conn.row_factory = sqlite3.Row
+    # WAL turns every commit into a sequential log append and, with
+    # synchronous=NORMAL, skips the per-commit fsync of the database file.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Fold the log back into the database every ~1000 pages (~4 MiB) so the
+    # WAL file stays small; pinned here so a build default cannot change it.
+    conn.execute("PRAGMA wal_autocheckpoint=1000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=134217728")  # 128 MiB
+    conn.execute("PRAGMA cache_size=-20000")  # ~20 MiB
+    conn.execute("PRAGMA busy_timeout=5000")  # wait for ChatHistoryUI's deletes
+    return conn
+
+
+def init_db() -> sqlite3.Connection:
+    """
+    Create the SQLite file and table if they do not exist.
+    Returns a connection object that stays open for the lifetime of the bot.
+    """
+    conn = _connect()
+    conn.execute(_CREATE_MESSAGES_SQL.format(table="messages"))
+    _migrate_text_timestamps(conn)
+    # ``fetch_recent_messages`` orders by (timestamp, id); these indices turn
+    # its filtered ``ORDER BY ... LIMIT`` into an index range scan, and do the
+    # same for ChatHistoryUI's sorted table.
+    for name, cols in _INDICES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON messages({cols})")
     conn.commit()
     return conn
 
 
+_INSERT_SQL = """
+    INSERT INTO messages
+        (user_id, user_name, channel_id, is_dm, role, content, timestamp)
+    VALUES
+"""
+_ROW_PLACEHOLDERS = "(?, ?, ?, ?, ?, ?, ?)"
+
+# Rows per multi-VALUES INSERT: 100 × 7 = 700 bound variables, safely below
+# SQLite's historical 999-variable limit.
+_MAX_ROWS_PER_INSERT = 100
+
+
+@functools.lru_cache(maxsize=None)
+def _insert_sql(n: int) -> str:
+    """Return an ``INSERT`` statement with *n* rows of placeholders."""
+    return _INSERT_SQL + ", ".join([_ROW_PLACEHOLDERS] * n)
+
+
+def _message_row(
+    user_id: int,
+    channel_id: int,
+    is_dm: bool,
+    role: str,
+    content: str,
+    user_name: str,
+) -> Tuple[Any, ...]:
+    """
+    Build the insert parameters for one message, stamped now (Unix epoch in
+    nanoseconds).
+    """
+    ts = time.time_ns()
+    return (user_id, user_name, channel_id, int(is_dm), role, content, ts)
+
+
+# on_message hands every write to this single dedicated thread, so disk I/O
+# never blocks the event loop (and with it Discord's gateway heartbeat) and
+# writes are applied in the order they were submitted.
+_DB_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-db")
+
+# Serialises access to the shared connection between the database thread and
+# direct callers such as fetch_recent_messages.
+_DB_LOCK = threading.Lock()
+
+
+def _insert_messages(conn: sqlite3.Connection, rows: Iterable[Tuple[Any, ...]]) -> None:
+    """
+    Insert several chat messages (built by :func:`_message_row`) in a single
+    transaction, so a whole turn costs one commit.  The rows are sent as one
+    multi-row ``INSERT ... VALUES (...), (...)`` statement per batch.
+    """
+    rows = list(rows)
+    with _DB_LOCK, conn:
+        for start in range(0, len(rows), _MAX_ROWS_PER_INSERT):
+            batch = rows[start : start + _MAX_ROWS_PER_INSERT]
+            conn.execute(
+                _insert_sql(len(batch)), [value for row in batch for value in row]
+            )
+
+
 def _insert_message(
     conn: sqlite3.Connection,
     user_id: int,
@@ -99,17 +278,9 @@ def _insert_message(
     user_name: str,
 ) -> None:
     """Insert a single chat message into the database."""
-    ts = datetime.datetime.utcnow().isoformat()
-    conn.execute(
-        """
-        INSERT INTO messages
-            (user_id, user_name, channel_id, is_dm, role, content, timestamp)
-        VALUES
-            (?, ?, ?, ?, ?, ?, ?)
-        """,
-        (user_id, user_name, channel_id, int(is_dm), role, content, ts),
+    _insert_messages(
+        conn, [_message_row(user_id, channel_id, is_dm, role, content, user_name)]
     )
-    conn.commit()
 
 
 def fetch_recent_messages(
@@ -117,12 +288,15 @@ def fetch_recent_messages(
     user_id: int | None = None,
     channel_id: int | None = None,
     limit: int = 20,
-) -> List[Tuple[Any, ...]]:
+) -> List[sqlite3.Row]:
     """
     Retrieve the *limit* most recent messages, optionally filtered by
     *user_id* or *channel_id*.
     """
-    sql = "SELECT * FROM messages"
+    sql = (
+        "SELECT id, user_id, user_name, channel_id, is_dm, role, content, timestamp"
+        " FROM messages"
+    )
     params: List[Any] = []
     clauses: List[str] = []
 
@@ -137,11 +311,11 @@ def fetch_recent_messages(
     if clauses:
         sql += " WHERE " + " AND ".join(clauses)
 
-    sql += " ORDER BY timestamp DESC LIMIT ?"
+    sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
     params.append(limit)
 
-    cursor = conn.execute(sql, params)
-    return cursor.fetchall()
+    with _DB_LOCK:
+        return conn.execute(sql, params).fetchall()
 
 
 # Global DB connection – opened once at import time
@@ -149,7 +323,8 @@ DB_CONN = init_db()
 
 
 def close_db() -> None:
-    """Close the SQLite connection on interpreter shutdown."""
+    """Flush pending writes and close the SQLite connection on shutdown."""
+    _DB_EXECUTOR.shutdown(wait=True)
     if DB_CONN:
         DB_CONN.close()
 
@@ -170,6 +345,11 @@ class _TestableClient(Client):
         super().__init__(*args, **kwargs)
         self._user = None
 
+    async def close(self) -> None:
+        """Close the shared Ollama HTTP session along with the Discord client."""
+        await close_session()
+        await super().close()
+
     @property
     def user(self) -> discord.User | None:  # pragma: no cover
         return self._user
@@ -183,41 +363,273 @@ intents = Intents.default()
 intents.message_content = True
 client = _TestableClient(intents=intents)
 
+
+class _HistoryCache:
+    """
+    Per‑conversation message history with least‑recently‑used eviction.
+
+    Each conversation keeps at most *maxlen* messages, and only the *maxsize*
+    most recently active conversations are retained.
+    """
+
+    def __init__(self, maxsize: int = 1024, maxlen: int = 20) -> None:
+        self._maxsize = maxsize
+        self._maxlen = maxlen
+        self._data: OrderedDict[int, deque] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: int) -> deque:
+        """Return the history for *key*, creating it (and evicting) if needed."""
+        history = self._data.get(key)
+        if history is None:
+            history = self._data[key] = deque(maxlen=self._maxlen)
+            if len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+        else:
+            self._data.move_to_end(key)
+        return history
+
+    def append(self, key: int, msg: Dict[str, str]) -> None:
+        """Append *msg* to the history for *key*."""
+        self.get(key).append(msg)
+
+
 # Short in‑memory history used to build context for the model.
 # The history is capped at 20 messages per channel/DM.
-channel_histories: defaultdict[int, deque] = defaultdict(lambda: deque(maxlen=20))
-dm_histories: defaultdict[int, deque] = defaultdict(lambda: deque(maxlen=20))
+channel_histories = _HistoryCache()
+dm_histories = _HistoryCache()
 
 
 # --------------------------------------------------------------------------- #
 # 5. Ollama helper
 # --------------------------------------------------------------------------- #
-async def ollama_chat(messages: List[Dict[str, str]]) -> Tuple[str, str | None]:
+# One HTTP session shared by every Ollama request so connections are kept
+# alive and reused instead of being set up again for each Discord message.
+_SESSION: aiohttp.ClientSession | None = None
+
+
+async def _get_session() -> aiohttp.ClientSession:
     """
-    Send a conversation *messages* list to Ollama’s chat endpoint.
-    Returns the assistant’s final reply and the optional “thinking” text.
+    Return the shared Ollama session, creating it on first use.
+    Must be called from within the running event loop.
+    """
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=30),
+            timeout=OLLAMA_TIMEOUT,
+            headers={"Connection": "keep-alive", "Accept-Encoding": "gzip, deflate"},
+        )
+    return _SESSION
+
+
+async def close_session() -> None:
+    """Close the shared Ollama session, if one was opened."""
+    global _SESSION
+    if _SESSION is not None:
+        await _SESSION.close()
+        _SESSION = None
+
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+async def ollama_stream(
+    messages: Iterable[Dict[str, str]],
+) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Send a conversation *messages* to Ollama’s chat endpoint and yield
+    ``(content, thinking)`` text pieces as the model generates them.
+
+    *messages* may be any iterable (e.g. a history deque chained with the new
+    turn); it is materialised only once, for serialisation.
     """
     payload = {
         "model": MODEL_NAME,
-        "messages": messages,
-        "stream": False,  # stream==True would give real‑time chunks
+        "messages": list(messages),
+        "stream": True,  # one NDJSON object per generated piece
         "think": True,  # request the internal planning text
     }
 
-    async with aiohttp.ClientSession() as session:
-        resp = await session.post(f"{OLLAMA_URL}/chat", json=payload)
-
-        if resp.status != 200:
-            error_msg = await resp.text()
-            raise RuntimeError(f"Ollama error {resp.status}: {error_msg}")
-
-        data = await resp.json()
-        return data["message"]["content"], data["message"].get("thinking")
+    # Encode with orjson and send the bytes as-is; aiohttp's ``json=`` would
+    # go through the stdlib encoder.
+    session = await _get_session()
+    try:
+        async with session.post(
+            f"{OLLAMA_URL}/chat", data=orjson.dumps(payload), headers=_JSON_HEADERS
+        ) as resp:
+            if resp.status != 200:
+                error_msg = await resp.text()
+                raise RuntimeError(f"Ollama error {resp.status}: {error_msg}")
+
+            async for line in resp.content:
+                if not line.strip():
+                    continue
+                data = orjson.loads(line)
+                if "error" in data:
+                    raise RuntimeError(f"Ollama error: {data['error']}")
+                msg = data.get("message", {})
+                yield msg.get("content", ""), msg.get("thinking", "")
+                if data.get("done"):
+                    break
+    except asyncio.TimeoutError as exc:
+        # ``str()`` of a timeout is empty; say what actually happened.
+        raise RuntimeError(
+            "Ollama timed out (no connection within "
+            f"{OLLAMA_CONNECT_TIMEOUT} s or no data for {OLLAMA_READ_TIMEOUT} s)"
+        ) from exc
+
+
+async def ollama_chat(messages: Iterable[Dict[str, str]]) -> Tuple[str, str | None]:
+    """
+    Send a conversation *messages* to Ollama’s chat endpoint.
+    Returns the assistant’s final reply and the optional “thinking” text.
+    """
+    answer: List[str] = []
+    thinking: List[str] = []
+    async for content, thought in ollama_stream(messages):
+        answer.append(content)
+        thinking.append(thought)
+    return "".join(answer), "".join(thinking) or None
 
 
 # --------------------------------------------------------------------------- #
 # 6. Message handling
 # --------------------------------------------------------------------------- #
+# The bot’s own mention in both forms Discord emits (``<@id>`` and the
+# nickname form ``<@!id>``), known once the client has logged in.
+_BOT_MENTIONS: Tuple[str, ...] = ()
+
+
+@client.event
+async def on_ready() -> None:
+    """Cache the bot’s mention strings once the client has logged in."""
+    global _BOT_MENTIONS
+    _BOT_MENTIONS = (f"<@{client.user.id}>", f"<@!{client.user.id}>")
+
+
+async def _persist(rows: List[Tuple[Any, ...]]) -> None:
+    """Write a turn’s rows on the database thread without blocking the loop."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_DB_EXECUTOR, _insert_messages, DB_CONN, rows)
+
+
+class _ReplySender:
+    """
+    Send the chunks of one answer: the first as a reply to *message*, the
+    rest as plain messages in the same channel.
+
+    The reply is awaited so it always comes first.  Each follow‑up send is
+    started right away but waits for the one before it, so the chunks reach
+    Discord in order while the caller keeps streaming; :meth:`flush` waits
+    for the last of them.
+    """
+
+    def __init__(self, message: Message) -> None:
+        self._message = message
+        self._replied = False
+        self._last: asyncio.Future | None = None
+
+    async def send(self, chunk: str) -> None:
+        if self._replied:
+            self._last = asyncio.ensure_future(self._send_after(self._last, chunk))
+        else:
+            self._replied = True
+            await self._message.reply(chunk)
+
+    async def _send_after(self, previous: asyncio.Future | None, chunk: str) -> None:
+        # A failed earlier send propagates, so no later chunk is sent
+        if previous is not None:
+            await previous
+        await self._message.channel.send(chunk)
+
+    async def flush(self, return_exceptions: bool = False) -> None:
+        """
+        Wait for every follow‑up send started so far.  With
+        *return_exceptions* a failed send is swallowed instead of raised.
+        """
+        last, self._last = self._last, None
+        if last is not None:
+            await asyncio.gather(last, return_exceptions=return_exceptions)
+
+    async def send_all(self, chunks: Iterable[str]) -> None:
+        for chunk in chunks:
+            await self.send(chunk)
+        await self.flush()
+
+
+class _StreamFailed(Exception):
+    """
+    The answer stream broke off.  *sent* is the part of the answer that was
+    already sent to Discord (possibly empty); the message is the cause’s.
+    """
+
+    def __init__(self, sent: str, cause: Exception) -> None:
+        super().__init__(str(cause))
+        self.sent = sent
+
+
+async def _stream_reply(
+    sender: _ReplySender, messages: Iterable[Dict[str, str]]
+) -> Tuple[str, str | None, str]:
+    """
+    Stream the model’s answer to *messages*, sending every complete Discord
+    chunk through *sender* as soon as it is available.
+
+    Returns the whole answer, the optional “thinking” text and the tail of
+    the answer that has not been sent yet.  Raises :class:`_StreamFailed`
+    if the stream fails.
+    """
+    answer: List[str] = []
+    thinking: List[str] = []
+    pending = ""
+    try:
+        async for content, thought in ollama_stream(messages):
+            if thought:
+                thinking.append(thought)
+            if not content:
+                continue
+            answer.append(content)
+            pending += content
+
+            # Same splitting rule as chunk_text, applied only to text that is
+            # followed by more than a full chunk.
+            while len(pending) > DISCORD_MAX_CHARS:
+                cut = pending.rfind(" ", 0, DISCORD_MAX_CHARS)
+                if cut == -1:  # No space found → hard cut
+                    cut = DISCORD_MAX_CHARS
+                await sender.send(pending[:cut].rstrip())
+                pending = pending[cut:].lstrip()
+    except Exception as exc:
+        # Let the chunks already handed to Discord finish before reporting;
+        # a failed send must not mask the stream's own error.
+        await sender.flush(return_exceptions=True)
+        # ``pending`` is always a suffix of the answer, so what precedes it
+        # is exactly the text that was sent.
+        full = "".join(answer)
+        raise _StreamFailed(full[: len(full) - len(pending)].rstrip(), exc) from exc
+
+    return "".join(answer), "".join(thinking) or None, pending
+
+
+async def _persist_and_reply(
+    sender: _ReplySender, rows: List[Tuple[Any, ...]], text: str
+) -> None:
+    """Persist *rows* concurrently with sending the remaining reply *text*."""
+    await asyncio.gather(_persist(rows), sender.send_all(chunk_text(text)))
+
+
+def _clean(content: str) -> str:
+    """Remove the bot’s mentions from *content*."""
+    if not _BOT_MENTIONS:
+        return content
+    for mention in _BOT_MENTIONS:
+        content = content.replace(mention, "")
+    return content.strip()
+
+
 @client.event
 async def on_message(message: Message) -> None:
     """Main entry point for every incoming message."""
@@ -229,66 +641,85 @@ async def on_message(message: Message) -> None:
     channel_name = message.guild.name if message.guild else "DM"
     print(f"[{channel_name}] {message.author} ({message.author.id}): {message.content}")
 
-    # Persist the incoming user message
-    _insert_message(
-        DB_CONN,
-        user_id=message.author.id,
-        channel_id=message.channel.id,
-        is_dm=message.guild is None,
-        role="user",
-        content=message.content,
-        user_name=str(message.author),
-    )
+    # Rows persisted for this turn (user, optional thinking, assistant).  They
+    # are written together in one transaction once the turn is complete.
+    rows = [
+        _message_row(
+            user_id=message.author.id,
+            channel_id=message.channel.id,
+            is_dm=message.guild is None,
+            role="user",
+            content=message.content,
+            user_name=str(message.author),
+        )
+    ]
 
     # ----------------------------------------------------------------------- #
     # Handle direct messages (DMs)
     # ----------------------------------------------------------------------- #
     if message.guild is None:  # Private whisper
-        history = list(dm_histories[message.author.id])
-        history.append({"role": "user", "content": message.content})
+        user_turn = {"role": "user", "content": message.content}
+        history = itertools.chain(dm_histories.get(message.author.id), [user_turn])
 
+        sender = _ReplySender(message)
         try:
-            answer, thinking = await ollama_chat(history)
-        except Exception as exc:
+            answer, thinking, pending = await _stream_reply(sender, history)
+        except _StreamFailed as exc:
+            # Keep what Discord already shows in the database and history
+            if exc.sent:
+                rows.append(
+                    _message_row(
+                        user_id=message.author.id,
+                        channel_id=message.channel.id,
+                        is_dm=True,
+                        role="assistant",
+                        content=exc.sent,
+                        user_name=str(message.author),
+                    )
+                )
+                dm_histories.append(message.author.id, user_turn)
+                dm_histories.append(
+                    message.author.id, {"role": "assistant", "content": exc.sent}
+                )
+            await _persist(rows)
             await message.channel.send(f"⚠️ Error: {exc}")
             return
 
         # Log the internal “thinking” text if it exists
         if thinking:
             print(f"[Thinking] {thinking}")
-            _insert_message(
-                DB_CONN,
-                user_id=message.author.id,
-                channel_id=message.channel.id,
-                is_dm=True,
-                role="thinking",
-                content=thinking,
-                user_name=str(message.author),
+            rows.append(
+                _message_row(
+                    user_id=message.author.id,
+                    channel_id=message.channel.id,
+                    is_dm=True,
+                    role="thinking",
+                    content=thinking,
+                    user_name=str(message.author),
+                )
             )
 
         print(f"[Assistant] {answer}")
 
         # Persist the assistant reply
-        _insert_message(
-            DB_CONN,
-            user_id=message.author.id,
-            channel_id=message.channel.id,
-            is_dm=True,
-            role="assistant",
-            content=answer,
-            user_name=str(message.author),
+        rows.append(
+            _message_row(
+                user_id=message.author.id,
+                channel_id=message.channel.id,
+                is_dm=True,
+                role="assistant",
+                content=answer,
+                user_name=str(message.author),
+            )
         )
-
-        # Send the reply (split into chunks if it is too long)
-        for i, chunk in enumerate(chunk_text(answer)):
-            if i == 0:
-                await message.reply(chunk)
-            else:
-                await message.channel.send(chunk)
-
-        # Update the in‑memory history for future turns
-        dm_histories[message.author.id].extend(
-            history + [{"role": "assistant", "content": answer}]
+        # Persist the turn while sending the rest of the reply
+        await _persist_and_reply(sender, rows, pending)
+
+        # Update the in‑memory history for future turns.  Only this turn is
+        # appended; the earlier entries in ``history`` are already stored.
+        dm_histories.append(message.author.id, user_turn)
+        dm_histories.append(
+            message.author.id, {"role": "assistant", "content": answer}
         )
         return
 
@@ -296,58 +727,71 @@ async def on_message(message: Message) -> None:
     # Handle public channel messages that mention the bot
     # ----------------------------------------------------------------------- #
     if message.mentions:
-        history = list(channel_histories[message.channel.id])
-        history.append({"role": "user", "content": message.content})
-
-        # Remove the bot’s mention from the user text so the model sees the
-        # actual prompt content only.
-        # ``client.user`` might be ``None`` (e.g. before the bot has logged in
-        # or in a unit‑test that monkey‑patches it).  Build the mention string
-        # only when the user is present.
-        mention = client.user.mention if client.user else ""
-        for m in history:
-            if isinstance(m["content"], str) and mention:
-                m["content"] = m["content"].replace(mention, "").strip()
+        # The model only sees the prompt text, without the bot’s mention.
+        # Earlier entries were cleaned when they entered the history.
+        user_turn = {"role": "user", "content": _clean(message.content)}
+        history = itertools.chain(
+            channel_histories.get(message.channel.id), [user_turn]
+        )
 
+        sender = _ReplySender(message)
         try:
-            answer, thinking = await ollama_chat(history)
-        except Exception as exc:
+            answer, thinking, pending = await _stream_reply(sender, history)
+        except _StreamFailed as exc:
+            # Keep what Discord already shows in the database and history
+            if exc.sent:
+                rows.append(
+                    _message_row(
+                        user_id=message.author.id,
+                        channel_id=message.channel.id,
+                        is_dm=False,
+                        role="assistant",
+                        content=exc.sent,
+                        user_name=str(message.author),
+                    )
+                )
+                channel_histories.append(message.channel.id, user_turn)
+                channel_histories.append(
+                    message.channel.id, {"role": "assistant", "content": exc.sent}
+                )
+            await _persist(rows)
             await message.reply(f"⚠️ Error: {exc}")
             return
 
         if thinking:
             print(f"[Thinking] {thinking}")
-            _insert_message(
-                DB_CONN,
+            rows.append(
+                _message_row(
+                    user_id=message.author.id,
+                    channel_id=message.channel.id,
+                    is_dm=False,
+                    role="thinking",
+                    content=thinking,
+                    user_name=str(message.author),
+                )
+            )
+
+        print(f"[Assistant] {answer}")
+
+        rows.append(
+            _message_row(
                 user_id=message.author.id,
                 channel_id=message.channel.id,
                 is_dm=False,
-                role="thinking",
-                content=thinking,
+                role="assistant",
+                content=answer,
                 user_name=str(message.author),
             )
-
-        print(f"[Assistant] {answer}")
-
-        _insert_message(
-            DB_CONN,
-            user_id=message.author.id,
-            channel_id=message.channel.id,
-            is_dm=False,
-            role="assistant",
-            content=answer,
-            user_name=str(message.author),
         )
+        await _persist_and_reply(sender, rows, pending)
 
-        for i, chunk in enumerate(chunk_text(answer)):
-            if i == 0:
-                await message.reply(chunk)
-            else:
-                await message.channel.send(chunk)
-
-        channel_histories[message.channel.id].extend(
-            history + [{"role": "assistant", "content": answer}]
+        channel_histories.append(message.channel.id, user_turn)
+        channel_histories.append(
+            message.channel.id, {"role": "assistant", "content": answer}
         )
+    else:
+        # Not addressed to the bot – only the user message is recorded
+        await _persist(rows)
 
 
 # --------------------------------------------------------------------------- #
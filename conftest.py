@@ -3,15 +3,21 @@ import importlib
 import pytest
 
 
-# Autouse fixture – inject the LlamaGPT module into each test module.
-@pytest.fixture(autouse=True)
-def _inject_LlamaGPT(request):
-    module = importlib.import_module("LlamaGPT")
-    setattr(request.module, "LlamaGPT", module)
-
-
 # Explicit fixture – returned when a test declares a `LlamaGPT` parameter.
-@pytest.fixture
-def LlamaGPT():
+# The module is imported once per session so its import‑time side effects
+# (DB connection, atexit registration) are not repeated.  The database it
+# opens on import lives in a temporary directory, never in the working tree.
+@pytest.fixture(scope="session")
+def LlamaGPT(tmp_path_factory):
     """Return the imported LlamaGPT module."""
-    return importlib.import_module("LlamaGPT")
+    db_path = tmp_path_factory.mktemp("bot") / "chat_history.db"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("CHAT_HISTORY_DB", str(db_path))
+        return importlib.import_module("LlamaGPT")
+
+
+# Autouse fixture – inject the LlamaGPT module into each test module, once
+# per module rather than before every test.
+@pytest.fixture(scope="module", autouse=True)
+def _inject_LlamaGPT(request, LlamaGPT):
+    setattr(request.module, "LlamaGPT", LlamaGPT)
@@ -15,119 +15,185 @@ has been cleaned up for readability:
 # --------------------------------------------------------------------------- #
 # Imports
 # --------------------------------------------------------------------------- #
+import asyncio
 import os
+import shutil
 import sqlite3
+import threading
+from collections.abc import Callable
 from pathlib import Path
+from types import SimpleNamespace
 from unittest import mock
 
 import pytest
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output import DummyOutput
 
 
 # --------------------------------------------------------------------------- #
 # Fixtures
 # --------------------------------------------------------------------------- #
+@pytest.fixture(scope="session")
+def _schema_template(LlamaGPT, tmp_path_factory) -> Path:
+    """
+    Build a database with the bot's schema (table and indices) once per
+    session.  WAL mode is stored in the file, so every copy starts out in WAL
+    too.
+    """
+    template = tmp_path_factory.mktemp("schema") / "chat_history_template.db"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(LlamaGPT, "DB_PATH", str(template))
+        LlamaGPT.init_db().close()
+    return template
+
+
 @pytest.fixture
-def tmp_db(tmp_path: Path) -> Path:
+def tmp_db(_schema_template: Path, tmp_path: Path) -> Path:
     """Create a temporary SQLite database with the expected messages table."""
     db_path = tmp_path / "chat_history.db"
-    conn = sqlite3.connect(db_path)
-    conn.executescript(
-        """
-        CREATE TABLE messages (
-            id          INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id     INTEGER,
-            user_name   TEXT,
-            channel_id  INTEGER,
-            is_dm       INTEGER,
-            role        TEXT,
-            content     TEXT,
-            timestamp   TEXT
-        )
-        """
-    )
-    conn.commit()
-    conn.close()
+    shutil.copyfile(_schema_template, db_path)
     return db_path
 
 
 @pytest.fixture
-def chat_ui(tmp_db: Path):
-    """Reload the UI module after setting the environment variable."""
-    os.environ["CHAT_HISTORY_DB"] = str(tmp_db)
+def db_conn(tmp_db: Path):
+    """
+    A separate autocommit connection to the test database, standing in for
+    the bot.  Opened once per test and shared by all of its statements.
+    """
+    conn = sqlite3.connect(tmp_db, isolation_level=None)
+    conn.execute("PRAGMA synchronous=NORMAL")  # no fsync per commit in WAL
+    yield conn
+    conn.close()
 
-    import importlib
 
-    import ChatHistoryUI
+@pytest.fixture(scope="session")
+def chat_ui(_schema_template: Path, tmp_path_factory):
+    """
+    Import the UI module once per session.  The module refuses to load
+    without a database, so it starts out pointed at a throw‑away one.
+    """
+    db_path = tmp_path_factory.mktemp("chat_ui") / "chat_history.db"
+    shutil.copyfile(_schema_template, db_path)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("CHAT_HISTORY_DB", str(db_path))
+        import ChatHistoryUI
 
-    importlib.reload(ChatHistoryUI)
     return ChatHistoryUI
 
 
 @pytest.fixture
-def dummy_event() -> mock.Mock:
-    """A minimal event with an ``app.invalidate`` method."""
-    return mock.Mock(app=mock.Mock(invalidate=mock.Mock()))
+def chat_ui_patched(chat_ui, tmp_db: Path, monkeypatch):
+    """Point the session's UI module at this test's database."""
+    monkeypatch.setattr(chat_ui, "DB_PATH", str(tmp_db))
+    write_conn, read_conn = chat_ui._open_connections()
+    monkeypatch.setattr(chat_ui, "_WRITE_CONN", write_conn)
+    monkeypatch.setattr(chat_ui, "_READ_CONN", read_conn)
+
+    yield chat_ui
+
+    chat_ui._DB_EXECUTOR.submit(lambda: None).result()  # let deletes finish
+    write_conn.close()
+    read_conn.close()
 
 
 @pytest.fixture
-def cols() -> list[str]:
+def dummy_event() -> SimpleNamespace:
+    """A minimal event whose ``app.invalidate`` is a no‑op."""
+    return SimpleNamespace(app=SimpleNamespace(invalidate=lambda: None))
+
+
+# Column names used in all tests.  A tuple, so no test can alter it in place.
+_COLS: tuple[str, ...] = (
+    "id",
+    "user_id",
+    "user_name",
+    "channel_id",
+    "is_dm",
+    "role",
+    "content",
+    "timestamp",
+)
+
+
+@pytest.fixture
+def cols() -> tuple[str, ...]:
     """Column names used in all tests."""
-    return [
-        "id",
-        "user_id",
-        "user_name",
-        "channel_id",
-        "is_dm",
-        "role",
-        "content",
-        "timestamp",
-    ]
+    return _COLS
+
+
+# A deterministic set of rows for testing, built once at import.
+_ROWS: tuple[tuple, ...] = (
+    (
+        1,
+        1001,
+        "alice",
+        2001,
+        1,
+        "assistant",
+        "Answer 1",
+        "2024-02-08T10:00:00Z",
+    ),
+    (
+        2,
+        1002,
+        "bob",
+        2001,
+        1,
+        "user",
+        "Question 1",
+        "2024-02-08T10:01:00Z",
+    ),
+    (
+        3,
+        1003,
+        "charlie",
+        2001,
+        1,
+        "assistant",
+        "Answer 2",
+        "2024-02-08T10:02:00Z",
+    ),
+)
 
 
 def build_rows() -> list[tuple]:
-    """Return a deterministic set of rows for testing."""
-    return [
-        (
-            1,
-            1001,
-            "alice",
-            2001,
-            1,
-            "assistant",
-            "Answer 1",
-            "2024-02-08T10:00:00Z",
-        ),
-        (
-            2,
-            1002,
-            "bob",
-            2001,
-            1,
-            "user",
-            "Question 1",
-            "2024-02-08T10:01:00Z",
-        ),
-        (
-            3,
-            1003,
-            "charlie",
-            2001,
-            1,
-            "assistant",
-            "Answer 2",
-            "2024-02-08T10:02:00Z",
-        ),
-    ]
+    """Return a fresh, mutable copy of :data:`_ROWS`."""
+    return list(_ROWS)
 
 
 @pytest.fixture
-def table_ui(chat_ui, cols) -> "ChatHistoryUI.TableUI":
+def table_ui(chat_ui_patched, cols) -> "ChatHistoryUI.TableUI":
     """Instantiate a ``TableUI`` and configure it for all tests."""
-    ui = chat_ui.TableUI()
+    ui = chat_ui_patched.TableUI()
     ui.cols = cols
     return ui
 
 
+@pytest.fixture
+def rendered_body(table_ui) -> list[tuple[str, str]]:
+    """
+    The body of ``table_ui`` rendered once, for the sample rows with the
+    ``role`` cell of the second row selected.
+    """
+    table_ui.rows = build_rows()
+    table_ui.selected_row = 1  # second row
+    table_ui.selected_col = 2  # 'role' column
+    return table_ui._render_body()
+
+
+@pytest.fixture
+def handlers(table_ui) -> dict[str, Callable]:
+    """Key‑binding handlers of ``table_ui``, resolved once per test."""
+    kb = table_ui.kb
+    return {
+        key: kb.get_bindings_for_keys((key,))[0].handler
+        for key in (" ", "left", "right", "up", "down", "t", "x")
+    }
+
+
 # --------------------------------------------------------------------------- #
 # Tests
 # --------------------------------------------------------------------------- #
@@ -142,85 +208,170 @@ def test_header_rendering(table_ui):
     table_ui.selected_col = 0
     header_parts = table_ui._render_header()
     assert header_parts[0][0] == ""
+    assert header_parts[2][0] == "reverse bold"
 
     # Column names appear in order after the first invisible column
     names = [part[1].strip() for part in header_parts]
     assert names == ["user_name", "is_dm", "role", "timestamp"]
 
 
-def test_body_rendering_normal_rows(table_ui, dummy_event):
+def test_body_fragment_count(table_ui, rendered_body):
     """
-    Body rendering must produce a list of styled text tuples.
-    The selected cell should be highlighted and long values truncated.
+    Body rendering yields one fragment per plain row; the selected row is
+    split into prefix, highlighted cell and suffix.
     """
-    table_ui.rows = build_rows()
-    table_ui.selected_row = 1  # second row
-    table_ui.selected_col = 2  # 'role' column
+    assert len(rendered_body) == len(table_ui.rows) + 2
 
-    body = table_ui._render_body()
-    assert len(body) == len(table_ui.rows) * 5
 
-    # Selected cell styled as "reverse"
-    idx = table_ui.selected_row * 5 + table_ui.selected_col
-    style, text = body[idx]
+def test_body_selected_cell_style(rendered_body):
+    """
+    Only the selected cell is highlighted.
+    """
+    style, text = rendered_body[2]
     assert style == "reverse"
+    assert text.strip() == "user"
+    assert [style for style, _ in rendered_body].count("reverse") == 1
+
+
+def test_query_truncates_long_text(chat_ui_patched, db_conn, table_ui):
+    """
+    Long text values are truncated to the cell width by the list query.
+    """
+    db_conn.execute(
+        "INSERT INTO messages (user_name, role, timestamp) VALUES (?, ?, ?)",
+        ("x" * 50, "user", "2024-01-01T00:00:00Z"),
+    )
+    table_ui.cols, table_ui.rows = chat_ui_patched._query()
+    table_ui.selected_row = 1  # leave the row unhighlighted
 
-    # Truncation test
-    long_user = "x" * 50
-    table_ui.rows[0] = table_ui.rows[0][:2] + (long_user,) + table_ui.rows[0][3:]
     body = table_ui._render_body()
-    truncated = body[0][1].strip()
-    assert len(truncated) == 30  # 30 characters visible
+    assert body[0][1][:32].strip() == "x" * 30  # 30 characters visible
 
 
-def test_overlay_and_scrolling(table_ui, monkeypatch, dummy_event):
+def test_query_formats_nanosecond_timestamps(chat_ui_patched, db_conn):
     """
-    Overlay content is scrolled correctly when the terminal height is limited.
+    The bot's epoch‑nanosecond timestamps are shown as UTC date and time.
+    """
+    db_conn.execute(
+        "INSERT INTO messages (user_name, timestamp) VALUES (?, ?)",
+        ("alice", 1_704_067_200_123_000_000),
+    )
+    cols, rows = chat_ui_patched._query()
+    assert rows[0][cols.index("timestamp")] == "2024-01-01 00:00:00"
+
+
+def test_body_reuses_unchanged_row_fragments(table_ui):
+    """
+    Fragments of rows that did not change are reused between frames.
     """
-    # 5‑line terminal (1 header + 4 body lines)
-    monkeypatch.setattr(os, "get_terminal_size", lambda: os.terminal_size((80, 5)))
     table_ui.rows = build_rows()
-    table_ui.body_height = 4
+    table_ui.selected_row = 0
+
+    first = table_ui._render_body()
+    second = table_ui._render_body()
+    assert second[-1] is first[-1]
+
+    rows = build_rows()
+    rows[2] = rows[2][:2] + ("dave",) + rows[2][3:]
+    table_ui.rows = rows
+    third = table_ui._render_body()
+    assert third[-2] is first[-2]
+    assert third[-1] is not first[-1]
+    assert third[-1][1].startswith(" dave ")
+
+
+def test_navigation_at_edge_skips_redraw(table_ui, handlers):
+    """
+    Arrow keys that cannot move the selection do not invalidate the app.
+    """
+    event = mock.Mock()
+    table_ui.rows = build_rows()
+    table_ui.selected_row = 0
+    table_ui.selected_col = 0
+
+    handlers["left"](event)
+    handlers["up"](event)
+    event.app.invalidate.assert_not_called()
+
+    handlers["down"](event)
+    event.app.invalidate.assert_called_once()
+
+
+def test_reassigning_same_cols_keeps_display(table_ui, cols):
+    """
+    Re-assigning an equal column list (as every refresh does) does not
+    rebuild the pre-formatted display cells.
+    """
+    table_ui.rows = build_rows()
+    display = table_ui._display
+
+    table_ui.cols = tuple(list(cols))  # equal, but a different object
+    assert table_ui._display is display
+
+
+@pytest.mark.parametrize(
+    "offset,first,last",
+    [(0, "Line1", "Line4"), (1, "Line2", "Line5"), (2, "Line3", "Line6")],
+)
+def test_overlay_and_scrolling(table_ui, offset, first, last):
+    """
+    Overlay content is scrolled correctly when the body height is limited.
+    """
+    table_ui.rows = build_rows()
+    table_ui.body_height = 4  # e.g. a 5‑line terminal minus the header
 
     multiline = "Line1\nLine2\nLine3\nLine4\nLine5\nLine6"
     table_ui.overlay_content = multiline
-    table_ui.overlay_offset = 0
+    table_ui.overlay_offset = offset
 
     body = table_ui._render_body()
-    assert body[0][1].strip() == "Line1"
-    assert body[-1][1].strip() == "Line4"
+    assert body[0][1].strip() == first
+    assert body[-1][1].strip() == last
 
-    table_ui.overlay_offset = 1
-    body = table_ui._render_body()
-    assert body[0][1].strip() == "Line2"
-    assert body[-1][1].strip() == "Line5"
 
-    table_ui.overlay_offset = 2
-    body = table_ui._render_body()
-    assert body[0][1].strip() == "Line3"
-    assert body[-1][1].strip() == "Line6"
+def test_overlay_wrapping_is_memoized(table_ui, monkeypatch):
+    """
+    Overlay text is wrapped once per content/width, and blank lines survive.
+    """
+    import ChatHistoryUI
+
+    wrap = mock.Mock(side_effect=ChatHistoryUI.textwrap.wrap)
+    monkeypatch.setattr(ChatHistoryUI.textwrap, "wrap", wrap)
+
+    table_ui.overlay_content = "First\n\nThird"
+    assert table_ui._overlay_lines() == ["First", "", "Third"]
+    table_ui._overlay_lines()
+    assert wrap.call_count == 3  # one call per raw line, not per render
+
+    table_ui.body_width = 40
+    table_ui._overlay_lines()
+    assert wrap.call_count == 6
 
 
-def test_space_overlay_toggle(table_ui, dummy_event):
+@pytest.mark.asyncio
+async def test_space_overlay_toggle(
+    chat_ui_patched, db_conn, table_ui, handlers, dummy_event
+):
     """
-    Pressing space toggles the overlay of the selected row's content.
+    Pressing space toggles the overlay of the selected row's content,
+    which is loaded from the database by the row's id.
     """
-    table_ui.rows = build_rows()
+    db_conn.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", _ROWS)
+    table_ui.cols, table_ui.rows = chat_ui_patched._query()
     table_ui.selected_row = 0
 
+    assert "content" not in table_ui.cols
     assert table_ui.overlay_content is None
 
-    kb = table_ui.kb
-    space_handler = kb.get_bindings_for_keys((" ",))[0].handler
-    space_handler(dummy_event)
-    assert table_ui.overlay_content == table_ui.rows[0][6]
+    await handlers[" "](dummy_event)
+    assert table_ui.overlay_content == "Answer 2"  # newest row first
     assert table_ui.overlay_offset == 0
 
-    space_handler(dummy_event)
+    await handlers[" "](dummy_event)
     assert table_ui.overlay_content is None
 
 
-def test_column_navigation(table_ui, dummy_event):
+def test_column_navigation(table_ui, handlers, dummy_event):
     """
     Left/Right arrows move the column selection cursor,
     respecting the number of visible columns.
@@ -228,46 +379,39 @@ def test_column_navigation(table_ui, dummy_event):
     table_ui.rows = build_rows()
     table_ui.selected_col = 0
 
-    kb = table_ui.kb
-    left_handler = kb.get_bindings_for_keys(("left",))[0].handler
-    right_handler = kb.get_bindings_for_keys(("right",))[0].handler
-
-    right_handler(dummy_event)
+    handlers["right"](dummy_event)
     assert table_ui.selected_col == 1
 
     for _ in range(4):
-        right_handler(dummy_event)
+        handlers["right"](dummy_event)
     assert table_ui.selected_col == 3  # maximum visible columns
 
-    left_handler(dummy_event)
+    handlers["left"](dummy_event)
     assert table_ui.selected_col == 2
 
 
-def test_row_navigation_and_scrolling(table_ui, dummy_event):
+def test_row_navigation_and_scrolling(table_ui, handlers, dummy_event):
     """
     Up/Down arrows move the row cursor and scroll the view when needed.
     """
     table_ui.rows = build_rows()
     table_ui.selected_row = 1
 
-    kb = table_ui.kb
-    up_handler = kb.get_bindings_for_keys(("up",))[0].handler
-    down_handler = kb.get_bindings_for_keys(("down",))[0].handler
-
-    up_handler(dummy_event)
+    handlers["up"](dummy_event)
     assert table_ui.selected_row == 0
 
-    down_handler(dummy_event)
+    handlers["down"](dummy_event)
     assert table_ui.selected_row == 1
-    down_handler(dummy_event)
+    handlers["down"](dummy_event)
     assert table_ui.selected_row == 2
 
     # Cannot scroll past the last row
-    down_handler(dummy_event)
+    handlers["down"](dummy_event)
     assert table_ui.selected_row == 2
 
 
-def test_sorting_logic(table_ui, dummy_event):
+@pytest.mark.asyncio
+async def test_sorting_logic(table_ui, handlers, dummy_event):
     """
     Sorting toggles: pressing 't' on the same column reverses direction,
     pressing it on a new column starts with descending order.
@@ -275,44 +419,61 @@ def test_sorting_logic(table_ui, dummy_event):
     table_ui.rows = build_rows()
     table_ui.selected_col = 0  # 'user_name'
 
-    kb = table_ui.kb
-    t_handler = kb.get_bindings_for_keys(("t",))[0].handler
-
-    t_handler(dummy_event)
+    await handlers["t"](dummy_event)
     assert table_ui.sort_col == "user_name"
     assert table_ui.sort_descending is True
 
-    t_handler(dummy_event)
+    await handlers["t"](dummy_event)
     assert table_ui.sort_descending is False
 
     table_ui.selected_col = 2  # 'role'
-    t_handler(dummy_event)
+    await handlers["t"](dummy_event)
     assert table_ui.sort_col == "role"
     assert table_ui.sort_descending is True
 
 
-def test_delete_row(monkeypatch, tmp_db, dummy_event):
+@pytest.mark.asyncio
+async def test_db_keys_do_not_block_the_ui(
+    chat_ui_patched, db_conn, table_ui, handlers, dummy_event
+):
     """
-    Deleting a row removes it from the UI and the database.
+    Space and ``t`` wait for a busy database worker without blocking the
+    event loop.
     """
-    import importlib
+    db_conn.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", _ROWS)
+    table_ui.cols, table_ui.rows = chat_ui_patched._query()
+    for key in (" ", "t"):
+        gate = threading.Event()
+        chat_ui_patched._DB_EXECUTOR.submit(gate.wait, 2)  # e.g. a locked delete
+        task = asyncio.ensure_future(handlers[key](dummy_event))
+        await asyncio.sleep(0.01)
+        assert not task.done()
+        gate.set()
+        await task
+
+    assert table_ui.overlay_content == "Answer 2"
+    assert table_ui.sort_col == "user_name"
+    assert [row[2] for row in table_ui.rows] == ["charlie", "bob", "alice"]
 
-    import ChatHistoryUI
 
-    importlib.reload(ChatHistoryUI)
-
-    ui = ChatHistoryUI.TableUI()
-    ui.cols = [
-        "id",
-        "user_id",
-        "user_name",
-        "channel_id",
-        "is_dm",
-        "role",
-        "content",
-        "timestamp",
-    ]
-    ui.rows = [
+def test_query_rejects_unknown_sort_column(chat_ui_patched):
+    """
+    Only the visible columns can be interpolated into ORDER BY.
+    """
+    with pytest.raises(ValueError):
+        chat_ui_patched._query(order_by="id; DROP TABLE messages")
+
+    cols, rows = chat_ui_patched._query(order_by="role", descending=False)
+    assert "role" in cols
+    assert rows == []
+
+
+@pytest.mark.asyncio
+async def test_delete_row(table_ui, handlers, dummy_event):
+    """
+    Deleting a row removes it from the UI and the database.
+    """
+    table_ui.rows = [
         (
             42,
             42,
@@ -324,34 +485,446 @@ def test_delete_row(monkeypatch, tmp_db, dummy_event):
             "2024-01-01T00:00:00Z",
         )
     ]
-    ui.selected_row = 0
-    ui.selected_col = 0
-    ui.overlay_content = None
+    table_ui.selected_row = 0
+    table_ui.selected_col = 0
+    table_ui.overlay_content = None
+
+    await handlers["x"](dummy_event)
+
+    assert len(table_ui.rows) == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_row_removes_by_id(
+    chat_ui_patched, db_conn, table_ui, handlers, dummy_event
+):
+    """
+    Deleting a row removes exactly the database record with the row's id.
+    """
+    db_conn.executemany(
+        "INSERT INTO messages (id, user_name, content, timestamp)"
+        " VALUES (?, ?, ?, ?)",
+        [
+            (1, "alice", "same", "2024-01-01T00:00:00Z"),
+            (2, "alice", "same", "2024-01-01T00:00:00Z"),
+        ],
+    )
+
+    table_ui.cols, rows = chat_ui_patched._query()
+    table_ui.rows = [row for row in rows if row[0] == 2]
+    table_ui.selected_row = 0
 
-    kb = ui.kb
-    x_handler = kb.get_bindings_for_keys(("x",))[0].handler
-    x_handler(dummy_event)
+    await handlers["x"](dummy_event)
 
-    assert len(ui.rows) == 0
+    remaining = [r[0] for r in db_conn.execute("SELECT id FROM messages")]
+    assert remaining == [1]
 
 
-def test_delete_ignores_overlay(monkeypatch, tmp_db, dummy_event):
+@pytest.mark.asyncio
+async def test_delete_ignores_overlay(table_ui, handlers, dummy_event):
     """
     Deleting while an overlay is active should be a no‑op.
     """
+    table_ui.overlay_content = "some content"
+    table_ui.selected_row = 0
+
+    await handlers["x"](dummy_event)
+
+    assert table_ui.overlay_content == "some content"
 
-    import importlib
 
+@pytest.mark.asyncio
+async def test_refresh_waits_for_dirty_flag(table_ui, db_conn):
+    """
+    The refresh task only reloads the table after the UI is flagged dirty.
+    """
     import ChatHistoryUI
 
-    importlib.reload(ChatHistoryUI)
+    table_ui.app = mock.Mock()
+    task = asyncio.create_task(ChatHistoryUI._periodic_refresh(table_ui))
+
+    db_conn.execute(
+        "INSERT INTO messages (user_name, role, content, timestamp)"
+        " VALUES ('alice', 'user', 'hi', '2024-01-01T00:00:00Z')"
+    )
+
+    await asyncio.sleep(ChatHistoryUI._REFRESH_DEBOUNCE * 2)
+    assert table_ui.rows == []
+
+    table_ui._dirty.set()
+    await asyncio.sleep(ChatHistoryUI._REFRESH_DEBOUNCE * 2)
+    task.cancel()
+
+    assert len(table_ui.rows) == 1
+    assert not table_ui._dirty.is_set()
+    table_ui.app.invalidate.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_watcher_flags_external_writes(table_ui, db_conn):
+    """
+    The data_version watcher sets the dirty flag after another connection commits.
+    """
+    import ChatHistoryUI
 
-    ui = ChatHistoryUI.TableUI()
-    ui.overlay_content = "some content"
-    ui.selected_row = 0
+    stop = threading.Event()
+    watcher = threading.Thread(
+        target=ChatHistoryUI._watch_data_version,
+        args=(table_ui, asyncio.get_running_loop(), stop),
+        daemon=True,
+    )
+    watcher.start()
+    await asyncio.sleep(ChatHistoryUI._WATCH_INTERVAL * 2)
+    assert not table_ui._dirty.is_set()
+
+    db_conn.execute("INSERT INTO messages (content) VALUES ('hi')")
+
+    await asyncio.wait_for(table_ui._dirty.wait(), timeout=2)
+    stop.set()
+    watcher.join()
+
+
+def test_merge_rows_keeps_sort_order(chat_ui):
+    """
+    New rows are merged into the sorted table and replace stale duplicates.
+    """
+    # The sort key (the last column) is the timestamp.
+    rows = sorted(build_rows(), key=lambda r: r[7], reverse=True)
+    rows = [row + (row[7],) for row in rows]
+    newer = (4, 1004, "dave", 2001, 0, "user", "Question 2", "2024-02-08T10:03:00Z")
+    newer += (newer[7],)
+    stale = rows[0][:6] + ("Edited",) + rows[0][7:]
+
+    merged = chat_ui._merge_rows(rows, [newer, stale], True)
+    assert [r[0] for r in merged] == [4, 3, 2, 1]
+    assert merged[1][6] == "Edited"
+
+
+@pytest.mark.parametrize("order_by", ["timestamp", "role"])
+@pytest.mark.parametrize("descending", [True, False], ids=["desc", "asc"])
+def test_merge_rows_matches_full_query(chat_ui_patched, db_conn, order_by, descending):
+    """
+    Merging new rows gives the order of a full query, also for rows whose
+    displayed timestamps are equal and for ties in the sort column.
+    """
+    second = 1_704_067_200_000_000_000  # 2024-01-01 00:00:00 UTC in ns
+    insert = "INSERT INTO messages (id, role, timestamp) VALUES (?, ?, ?)"
+    db_conn.executemany(insert, [(1, "user", second + 1), (2, "user", second + 2)])
+    _, rows = chat_ui_patched._query(order_by=order_by, descending=descending)
+
+    db_conn.executemany(
+        insert, [(3, "assistant", second + 3), (4, "user", second + 4), (5, None, None)]
+    )
+    _, new_rows = chat_ui_patched._query(
+        order_by=order_by, descending=descending, after_id=2
+    )
+
+    merged = chat_ui_patched._merge_rows(rows, new_rows, descending)
+    _, full = chat_ui_patched._query(order_by=order_by, descending=descending)
+    assert merged == full
+
+
+def test_row_changes_only_looks_up_keys(chat_ui_patched, db_conn):
+    """
+    Checking for new and vanished rows never scans the table.
+    """
+    db_conn.executemany(
+        "INSERT INTO messages (id, content) VALUES (?, 'hi')", [(1,), (2,), (3,)]
+    )
+    statements: list[str] = []
+    chat_ui_patched._READ_CONN.set_trace_callback(statements.append)
+    try:
+        changes = chat_ui_patched._row_changes(1, [1, 4])
+    finally:
+        chat_ui_patched._READ_CONN.set_trace_callback(None)
+
+    assert changes == (3, 2, 1)
+    assert len(statements) == 2
+    for sql in statements:
+        plan = " ".join(row[3] for row in db_conn.execute("EXPLAIN QUERY PLAN " + sql))
+        assert "SCAN" not in plan, (sql, plan)
+
+
+@pytest.mark.asyncio
+async def test_refresh_fetches_only_new_rows(table_ui, db_conn, monkeypatch):
+    """
+    After an insert the refresh queries only rows newer than the last seen id.
+    """
+    import ChatHistoryUI
+
+    table_ui.app = mock.Mock()
+    calls = []
+    real_query = ChatHistoryUI._query
+
+    def spy_query(*args, **kwargs):
+        calls.append(kwargs.get("after_id"))
+        return real_query(*args, **kwargs)
+
+    monkeypatch.setattr(ChatHistoryUI, "_query", spy_query)
+    task = asyncio.create_task(ChatHistoryUI._periodic_refresh(table_ui))
+
+    db_conn.execute("INSERT INTO messages (content, timestamp) VALUES ('a', '1')")
+    table_ui._dirty.set()
+    await asyncio.sleep(ChatHistoryUI._REFRESH_DEBOUNCE * 2)
+
+    db_conn.execute("DELETE FROM messages")
+    table_ui._dirty.set()
+    await asyncio.sleep(ChatHistoryUI._REFRESH_DEBOUNCE * 2)
+    task.cancel()
+
+    # First refresh is incremental, the delete forces a full reload.
+    assert calls == [0, None]
+    assert table_ui.rows == []
+
+
+@pytest.mark.asyncio
+async def test_refresh_reloads_after_delete_and_insert(
+    table_ui, db_conn, monkeypatch
+):
+    """
+    A delete followed by an insert in the same window forces a full reload,
+    even though MAX(id) grew.
+    """
+    import ChatHistoryUI
+
+    db_conn.execute("INSERT INTO messages (content) VALUES ('old')")
+    table_ui.cols, table_ui.rows = ChatHistoryUI._query()
+    table_ui._last_max_id = ChatHistoryUI._max_id()
+    table_ui.app = mock.Mock()
+    calls = []
+    real_query = ChatHistoryUI._query
+
+    def spy_query(*args, **kwargs):
+        calls.append(kwargs.get("after_id"))
+        return real_query(*args, **kwargs)
+
+    monkeypatch.setattr(ChatHistoryUI, "_query", spy_query)
+    task = asyncio.create_task(ChatHistoryUI._periodic_refresh(table_ui))
+
+    db_conn.execute("DELETE FROM messages")
+    db_conn.execute("INSERT INTO messages (content) VALUES ('new')")
+    table_ui._dirty.set()
+    await asyncio.sleep(ChatHistoryUI._REFRESH_DEBOUNCE * 2)
+    task.cancel()
+
+    (new_id,) = db_conn.execute("SELECT id FROM messages").fetchone()
+    assert calls == [None]
+    assert [row[0] for row in table_ui.rows] == [new_id]
+
+
+@pytest.mark.asyncio
+async def test_failed_delete_reloads_table(
+    table_ui, db_conn, handlers, dummy_event, monkeypatch
+):
+    """
+    A delete that fails in the database brings the row back into the table.
+    """
+    import ChatHistoryUI
 
-    kb = ui.kb
-    x_handler = kb.get_bindings_for_keys(("x",))[0].handler
-    x_handler(dummy_event)
+    db_conn.execute("INSERT INTO messages (content) VALUES ('hi')")
+    table_ui.cols, table_ui.rows = ChatHistoryUI._query()
+    table_ui._last_max_id = ChatHistoryUI._max_id()
+    table_ui._last_data_version = ChatHistoryUI._data_version()
+    table_ui.app = mock.Mock()
 
-    assert ui.overlay_content == "some content"
+    def locked(row_id):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(ChatHistoryUI, "_delete_message", locked)
+    task = asyncio.create_task(ChatHistoryUI._periodic_refresh(table_ui))
+
+    delete = asyncio.ensure_future(handlers["x"](dummy_event))
+    await asyncio.sleep(0)
+    assert table_ui.rows == []
+    await delete
+
+    await asyncio.sleep(ChatHistoryUI._REFRESH_DEBOUNCE * 2)
+    task.cancel()
+
+    assert len(table_ui.rows) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_delete_survives_concurrent_refresh(
+    table_ui, db_conn, handlers, dummy_event, monkeypatch
+):
+    """
+    A refresh that is still running when a delete fails does not hide the
+    failure; the row comes back once the refresh has finished.
+    """
+    import ChatHistoryUI
+
+    db_conn.execute("INSERT INTO messages (content) VALUES ('hi')")
+    table_ui.cols, table_ui.rows = ChatHistoryUI._query()
+    table_ui._last_max_id = ChatHistoryUI._max_id()
+    table_ui._last_data_version = ChatHistoryUI._data_version()
+    table_ui.app = mock.Mock()
+
+    def locked(row_id):
+        raise sqlite3.OperationalError("database is locked")
+
+    gate = threading.Event()
+    real_row_changes = ChatHistoryUI._row_changes
+
+    def slow_row_changes(*args):
+        gate.wait(timeout=2)
+        return real_row_changes(*args)
+
+    monkeypatch.setattr(ChatHistoryUI, "_delete_message", locked)
+    monkeypatch.setattr(ChatHistoryUI, "_row_changes", slow_row_changes)
+    task = asyncio.create_task(ChatHistoryUI._periodic_refresh(table_ui))
+
+    db_conn.execute("INSERT INTO messages (content) VALUES ('new')")
+    table_ui._dirty.set()
+    await asyncio.sleep(ChatHistoryUI._REFRESH_DEBOUNCE * 2)  # refresh is waiting
+
+    delete = asyncio.ensure_future(handlers["x"](dummy_event))
+    await asyncio.sleep(0)
+    gate.set()
+    await delete
+    await asyncio.sleep(ChatHistoryUI._REFRESH_DEBOUNCE * 4)
+    task.cancel()
+
+    assert sorted(row[0] for row in table_ui.rows) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_deleted_row_stays_gone_after_concurrent_reload(
+    table_ui, db_conn, handlers, dummy_event, monkeypatch
+):
+    """
+    A row deleted while a full reload is running does not come back with the
+    reload's result.
+    """
+    import ChatHistoryUI
+
+    db_conn.executemany("INSERT INTO messages (content) VALUES (?)", [("a",), ("b",)])
+    table_ui.cols, table_ui.rows = ChatHistoryUI._query()
+    table_ui._last_max_id = ChatHistoryUI._max_id()
+    table_ui._last_data_version = ChatHistoryUI._data_version()
+    table_ui.selected_row = 0  # id 2, the newest row
+    table_ui.app = mock.Mock()
+
+    gate = threading.Event()
+    real_query = ChatHistoryUI._query
+
+    def slow_query(*args, **kwargs):
+        gate.wait(timeout=2)
+        return real_query(*args, **kwargs)
+
+    monkeypatch.setattr(ChatHistoryUI, "_query", slow_query)
+    task = asyncio.create_task(ChatHistoryUI._periodic_refresh(table_ui))
+
+    db_conn.execute("UPDATE messages SET content = 'edited' WHERE id = 1")
+    table_ui._dirty.set()
+    await asyncio.sleep(ChatHistoryUI._REFRESH_DEBOUNCE * 2)  # reload is reading
+
+    delete = asyncio.ensure_future(handlers["x"](dummy_event))
+    await asyncio.sleep(0)
+    gate.set()
+    await delete
+    await asyncio.sleep(ChatHistoryUI._REFRESH_DEBOUNCE * 4)
+    task.cancel()
+
+    assert [row[0] for row in table_ui.rows] == [1]
+    assert [row[0] for row in db_conn.execute("SELECT id FROM messages")] == [1]
+
+
+@pytest.mark.asyncio
+async def test_refresh_skips_own_writes(
+    table_ui, handlers, dummy_event, monkeypatch
+):
+    """
+    A dirty flag caused only by the UI's own delete does not reload the table.
+    """
+    import ChatHistoryUI
+
+    ChatHistoryUI._WRITE_CONN.execute("INSERT INTO messages (content) VALUES ('hi')")
+    table_ui.cols, table_ui.rows = ChatHistoryUI._query()
+    table_ui.selected_row = 0
+    table_ui._last_data_version = ChatHistoryUI._data_version()
+    table_ui.app = mock.Mock()
+
+    await handlers["x"](dummy_event)
+
+    query = mock.Mock()
+    monkeypatch.setattr(ChatHistoryUI, "_query", query)
+    task = asyncio.create_task(ChatHistoryUI._periodic_refresh(table_ui))
+    table_ui._dirty.set()
+    await asyncio.sleep(ChatHistoryUI._REFRESH_DEBOUNCE * 2)
+    task.cancel()
+
+    query.assert_not_called()
+    table_ui.app.invalidate.assert_not_called()
+
+
+def test_sortable_columns_are_indexed(chat_ui_patched, db_conn):
+    """
+    The bot's schema has an index for every column the UI sorts on.
+    """
+    plans = {
+        col: " ".join(
+            row[3]
+            for row in db_conn.execute(
+                "EXPLAIN QUERY PLAN " + chat_ui_patched._QUERIES[(col, True, False)]
+            )
+        )
+        for col in chat_ui_patched._SORTABLE_COLS
+    }
+
+    for col, plan in plans.items():
+        assert "USE TEMP B-TREE" not in plan, (col, plan)
+
+
+def test_redraws_are_rate_limited(table_ui):
+    """
+    The application coalesces invalidations to at most one redraw per frame.
+    """
+    import ChatHistoryUI
+
+    assert table_ui.app.min_redraw_interval == ChatHistoryUI._MIN_REDRAW_INTERVAL
+
+
+def test_body_size_comes_from_layout(table_ui, monkeypatch):
+    """
+    The body takes its size from the layout pass, not from the terminal.
+    """
+    get_size = mock.Mock(side_effect=OSError)
+    monkeypatch.setattr(os, "get_terminal_size", get_size)
+    table_ui.overlay_content = "\n".join(map(str, range(20)))
+
+    content = table_ui.body_control.create_content(40, 3)
+    assert (table_ui.body_width, table_ui.body_height) == (40, 3)
+    lines = ["".join(t for _, t in content.get_line(i)) for i in range(4)]
+    assert lines == ["0", "1", "2", ""]  # three rows and the final newline
+    get_size.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_body_renders_at_final_size(chat_ui_patched):
+    """
+    Every frame renders the body at the size it is laid out at – the screen
+    minus the header line – never at an earlier, measured one.
+    """
+    sizes = []
+    with create_pipe_input() as pipe, create_app_session(
+        input=pipe, output=DummyOutput()
+    ):
+        ui = chat_ui_patched.TableUI()
+        render_body = ui.body_control.text
+
+        def spy() -> list[tuple[str, str]]:
+            sizes.append((ui.body_width, ui.body_height))
+            return render_body()
+
+        def exit_after_first_frame(app) -> None:
+            if not app.is_done:
+                app.exit()
+
+        ui.body_control.text = spy
+        ui.app.after_render += exit_after_first_frame
+        await ui.app.run_async()
+
+    size = DummyOutput().get_size()
+    assert sizes
+    assert set(sizes) == {(size.columns, size.rows - 1)}
@@ -15,112 +15,195 @@ documents the intent of every fixture and test case.
 # Imports
 # --------------------------------------------------------------------------- #
 import asyncio
-import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from types import SimpleNamespace
 from unittest import mock
 
-import aiohttp
+import orjson
 import pytest
 
 
+# --------------------------------------------------------------------------- #
+#  Test payloads (built once at import)
+# --------------------------------------------------------------------------- #
+_PAD_A = "a" * 2000  # exactly the Discord limit
+_WORDS_500 = " ".join(["word"] * 500)  # > 2000 chars, splittable on spaces
+_LONG_X = "x" * 5000  # > 2000 chars, no space to split on
+_LONG_A = "A" * 4000  # two full Discord messages
+
+
+# --------------------------------------------------------------------------- #
+#  Fake Ollama streams (stand-ins for ``LlamaGPT.ollama_stream``)
+# --------------------------------------------------------------------------- #
+async def _ollama_ok(_messages):
+    """A short answer with some thinking, streamed in one piece."""
+    yield "Answer text", "Thinking text"
+
+
+async def _ollama_long(_messages):
+    """An answer that fills exactly two Discord messages, without thinking."""
+    yield _LONG_A, ""
+
+
+async def _ollama_public(_messages):
+    """A short channel answer without thinking."""
+    yield "Public answer", ""
+
+
+async def _ollama_boom(_messages):
+    """A stream that fails before producing anything."""
+    raise RuntimeError("boom")
+    yield  # pragma: no cover – makes this an async generator
+
+
+# --------------------------------------------------------------------------- #
+#  Fake Ollama HTTP responses
+# --------------------------------------------------------------------------- #
+@dataclass(slots=True)
+class _Response:
+    """A canned Ollama reply, usable as ``async with session.post(...)``."""
+
+    status: int
+    lines: tuple[bytes, ...] = ()
+    body: str = ""
+
+    @property
+    def content(self):
+        """The NDJSON body, line by line, as ``resp.content`` streams it."""
+
+        async def stream():
+            for line in self.lines:
+                yield line
+
+        return stream()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def text(self):
+        return self.body
+
+
+def _patch_post(session, status, lines=(), body=""):
+    """Make every ``session.post`` call return one shared canned response."""
+    response = _Response(status, tuple(lines), body)
+    return mock.patch.object(session, "post", new=mock.Mock(return_value=response))
+
+
 # --------------------------------------------------------------------------- #
 #  Fixtures
 # --------------------------------------------------------------------------- #
+@pytest.fixture(scope="module")
+def chunk_text(LlamaGPT):
+    """The function under test in the chunking tests, looked up once."""
+    return LlamaGPT.chunk_text
+
+
+@pytest.fixture(scope="session")
+def _schema_template(LlamaGPT):
+    """An in-memory database holding the bot's schema, built once per session."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(LlamaGPT, "DB_PATH", ":memory:")
+        template = LlamaGPT.init_db()
+
+    yield template
+
+    template.close()
+
+
 @pytest.fixture
-def tmp_db(tmp_path):
+def tmp_db(LlamaGPT, _schema_template, tmp_path, monkeypatch):
     """
-    Provide a fresh :mod:`LlamaGPT` module that writes to a temporary SQLite
-    database.
+    Point the :mod:`LlamaGPT` module at a fresh in-memory SQLite database.
 
-    The test suite patches the environment so the bot can initialise without
-    a real Discord token, re‑imports the module with the DB path overridden
-    and resets the atexit handler so the test run is isolated.
+    The module is imported once per session (see ``conftest.py``); each test
+    only swaps ``DB_PATH`` and ``DB_CONN``, which are restored afterwards.
+    Durability is irrelevant here, so nothing ever touches the disk, and the
+    schema is copied page by page from ``_schema_template`` instead of being
+    created again.
     """
-    db_path = tmp_path / "chat_history.db"
+    uri = f"file:chat_test_{id(tmp_path)}?mode=memory&cache=shared"
+    monkeypatch.setattr(LlamaGPT, "DB_PATH", uri)
+    conn = LlamaGPT._connect()
+    _schema_template.backup(conn)
+    conn.execute("PRAGMA synchronous=OFF")
+    monkeypatch.setattr(LlamaGPT, "DB_CONN", conn)
 
-    with mock.patch.dict(os.environ, {"DISCORD_TOKEN": "dummy"}):
-        import importlib
+    yield LlamaGPT
 
-        # Import the module *after* the environment variable is set
-        import LlamaGPT
+    conn.close()
 
-        # Override the DB path used by the module
-        LlamaGPT.DB_PATH = str(db_path)
 
-        # Re‑initialise the SQLite connection
-        LlamaGPT.DB_CONN.close()
-        LlamaGPT.DB_CONN = LlamaGPT.init_db()
+@dataclass(slots=True)
+class _FakeUser:
+    """A Discord user stand-in; ``str(user)`` is the name, as in discord.py."""
 
-        # Disable the real atexit handler – we want to keep the DB open for
-        # the duration of the test.
-        LlamaGPT.atexit.register = lambda *_, **__: None
+    id: int
+    name: str
+    bot: bool = False
 
-        yield LlamaGPT
-
-        # Final cleanup – close the DB once the fixture exits
-        LlamaGPT.DB_CONN.close()
+    def __str__(self) -> str:
+        return self.name
 
 
 @pytest.fixture
 def fake_user():
-    """A minimal mock representing a Discord user."""
-    user = mock.MagicMock()
-    user.id = 123456
-    user.name = "alice"
-    user.__str__.return_value = "alice"
-    user.bot = False
-    # Provide a string for the mention attribute – required by the bot
-    # logic that strips the mention from the user text.
-    user.mention = ""  # or "<@999999>" if you want a realistic mention
-    return user
+    """A minimal stand-in for a Discord user."""
+    return _FakeUser(id=123456, name="alice")
 
 
 @pytest.fixture
-def fake_channel(fake_user):
-    """A minimal mock representing a DM channel."""
-    chan = mock.MagicMock()
-    chan.id = 987654
-    chan.guild = None
-    chan.send = mock.AsyncMock()
-    chan.reply = mock.AsyncMock()
-    chan.name = "dm"
-    return chan
+def fake_channel():
+    """A minimal stand-in for a DM channel."""
+    return SimpleNamespace(
+        id=987654,
+        guild=None,
+        send=mock.AsyncMock(),
+        reply=mock.AsyncMock(),
+        name="dm",
+    )
 
 
 @pytest.fixture
 def fake_message(fake_user, fake_channel):
-    """A minimal mock representing a Discord message sent in a DM."""
-    msg = mock.MagicMock()
-    msg.author = fake_user
-    msg.content = "Hello @bot"
-    msg.channel = fake_channel
-    msg.guild = None
-    msg.mentions = []
-    msg.reply = mock.AsyncMock()
-    return msg
+    """A minimal stand-in for a Discord message sent in a DM."""
+    return SimpleNamespace(
+        author=fake_user,
+        content="Hello @bot",
+        channel=fake_channel,
+        guild=None,
+        mentions=[],
+        reply=mock.AsyncMock(),
+    )
 
 
 @pytest.fixture
 def fake_message_public(fake_user):
     """
-    A minimal mock representing a message posted in a public channel
+    A minimal stand-in for a message posted in a public channel
     that *mentions* the bot.
     """
-    chan = mock.MagicMock()
-    chan.id = 555
-    chan.guild = mock.MagicMock()
-    chan.guild.name = "TestGuild"
-    chan.send = mock.AsyncMock()
-    chan.reply = mock.AsyncMock()
-    chan.name = "general"
-
-    msg = mock.MagicMock()
-    msg.author = fake_user
-    msg.content = "Hey @bot can you help?"
-    msg.channel = chan
-    msg.guild = chan.guild
-    msg.mentions = [mock.MagicMock(id=999999)]  # Bot user ID
-    msg.reply = mock.AsyncMock()
-    return msg
+    guild = SimpleNamespace(name="TestGuild")
+    chan = SimpleNamespace(
+        id=555,
+        guild=guild,
+        send=mock.AsyncMock(),
+        reply=mock.AsyncMock(),
+        name="general",
+    )
+    return SimpleNamespace(
+        author=fake_user,
+        content="Hey @bot can you help?",
+        channel=chan,
+        guild=guild,
+        mentions=[SimpleNamespace(id=999999)],  # Bot user ID
+        reply=mock.AsyncMock(),
+    )
 
 
 @pytest.fixture
@@ -137,60 +220,40 @@ def fake_client(LlamaGPT, fake_user):
 # --------------------------------------------------------------------------- #
 #  Tests
 # --------------------------------------------------------------------------- #
-def test_chunkify_simple():
-    """Text shorter than the 2000‑char limit should not be split."""
-    from LlamaGPT import chunk_text
-
-    s = "a" * 2000
-    assert chunk_text(s) == [s]
-
-
-def test_chunkify_split_on_space():
-    """Long text containing spaces is split at the nearest space."""
-    from LlamaGPT import chunk_text
-
-    s = " ".join(["word"] * 500)  # > 2000 chars
-    chunks = chunk_text(s)
-
-    # All chunks are within the size limit and concatenating them restores
-    # the original text.
-    assert all(len(c) <= 2000 for c in chunks)
-    reassembled = "".join(c + " " for c in chunks[:-1]) + chunks[-1]
-    assert reassembled == s.strip()
-
-
-def test_chunkify_no_space_boundary(tmp_path):
-    """If a word is longer than the limit it is cut in the middle."""
-    from LlamaGPT import chunk_text
-
-    s = "x" * 5000
-    chunks = chunk_text(s)
+@pytest.mark.parametrize(
+    "text, joiner, n_chunks",
+    [
+        pytest.param(_PAD_A, "", 1, id="fits_limit"),
+        pytest.param(_WORDS_500, " ", 2, id="split_on_space"),
+        pytest.param(_LONG_X, "", 3, id="no_space_boundary"),
+    ],
+)
+def test_chunkify(chunk_text, text, joiner, n_chunks):
+    """
+    Text is split into chunks within the 2000‑char limit – at the nearest
+    space when there is one, mid‑word otherwise – and only the space at
+    each cut point is dropped, so ``joiner`` puts the text back together.
+    """
+    chunks = chunk_text(text)
 
-    assert all(len(c) <= 2000 for c in chunks)
-    assert "".join(chunks) == s
+    assert len(chunks) == n_chunks
+    assert max(map(len, chunks)) <= 2000
+    assert joiner.join(chunks) == text
 
 
 def test_insert_and_fetch(tmp_db, fake_user):
     """Insert and retrieve user/assistant messages from the DB."""
-    # Insert a user message
-    tmp_db._insert_message(
+    # Insert a user message and an assistant reply in one transaction
+    tmp_db._insert_messages(
         tmp_db.DB_CONN,
-        user_id=fake_user.id,
-        channel_id=111,
-        is_dm=False,
-        role="user",
-        content="Hello",
-        user_name=str(fake_user),
-    )
-    # Insert an assistant message
-    tmp_db._insert_message(
-        tmp_db.DB_CONN,
-        user_id=fake_user.id,
-        channel_id=111,
-        is_dm=False,
-        role="assistant",
-        content="Hi there",
-        user_name=str(fake_user),
+        [
+            tmp_db._message_row(
+                fake_user.id, 111, False, "user", "Hello", str(fake_user)
+            ),
+            tmp_db._message_row(
+                fake_user.id, 111, False, "assistant", "Hi there", str(fake_user)
+            ),
+        ],
     )
 
     # Retrieve all messages
@@ -199,6 +262,9 @@ def test_insert_and_fetch(tmp_db, fake_user):
     # The assistant message should appear first (most recent)
     assert rows[0][6] == "Hi there"
     assert rows[1][6] == "Hello"
+    # Columns can also be read by name
+    assert rows[0]["role"] == "assistant"
+    assert rows[1]["user_name"] == str(fake_user)
 
     # Various filter combinations
     assert len(tmp_db.fetch_recent_messages(tmp_db.DB_CONN, user_id=fake_user.id)) == 2
@@ -214,61 +280,207 @@ def test_insert_and_fetch(tmp_db, fake_user):
     assert tmp_db.fetch_recent_messages(tmp_db.DB_CONN, user_id=9999) == []
 
 
-@pytest.mark.asyncio
-async def test_ollama_chat_success(LlamaGPT):
-    """`ollama_chat` returns the assistant content on HTTP 200."""
-
-    async def fake_post(*_, **__):
-        class Response:
-            status = 200
+def test_insert_messages_batches(tmp_db):
+    """
+    Bulk inserts are split into multi-row statements of bounded size, all
+    committed in one transaction.
+    """
+    rows = [
+        tmp_db._message_row(1, 2, False, "user", f"msg {i}", "alice")
+        for i in range(tmp_db._MAX_ROWS_PER_INSERT * 2 + 5)
+    ]
+    statements = []
+    tmp_db.DB_CONN.set_trace_callback(statements.append)
+    try:
+        tmp_db._insert_messages(tmp_db.DB_CONN, rows)
+    finally:
+        tmp_db.DB_CONN.set_trace_callback(None)
+
+    verbs = [sql.split(None, 1)[0].upper() for sql in statements]
+    assert verbs == ["BEGIN", "INSERT", "INSERT", "INSERT", "COMMIT"]
+
+    stored = tmp_db.DB_CONN.execute("SELECT content FROM messages ORDER BY id")
+    assert [r[0] for r in stored] == [f"msg {i}" for i in range(len(rows))]
+
+
+def test_recent_messages_use_timestamp_index(tmp_db):
+    """Timestamps are integers and recent-message lookups avoid a sort."""
+    tmp_db._insert_message(tmp_db.DB_CONN, 1, 2, False, "user", "hi", "alice")
+    (ts,) = tmp_db.DB_CONN.execute("SELECT timestamp FROM messages").fetchone()
+    assert isinstance(ts, int)
+
+    for where in ("", " WHERE channel_id = 2", " WHERE user_id = 1"):
+        plan = tmp_db.DB_CONN.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM messages"
+            + where
+            + " ORDER BY timestamp DESC, id DESC LIMIT 20"
+        ).fetchall()
+        assert not any("TEMP B-TREE" in row[-1] for row in plan)
+
+
+def test_history_cache_evicts_least_recently_used(LlamaGPT):
+    """Only the most recently active conversations are kept."""
+    cache = LlamaGPT._HistoryCache(maxsize=2, maxlen=3)
+    cache.append(1, {"role": "user", "content": "a"})
+    cache.append(2, {"role": "user", "content": "b"})
+    cache.get(1)  # 1 is now more recent than 2
+    cache.append(3, {"role": "user", "content": "c"})
+
+    assert len(cache) == 2
+    assert [m["content"] for m in cache.get(1)] == ["a"]
+    assert list(cache.get(2)) == []  # evicted, recreated empty
+
+    for i in range(5):
+        cache.append(3, {"role": "user", "content": str(i)})
+    assert [m["content"] for m in cache.get(3)] == ["2", "3", "4"]
+
+
+def test_init_db_uses_wal(LlamaGPT, tmp_path, monkeypatch):
+    """The chat database file is opened in WAL mode with relaxed syncing."""
+    # WAL needs a real file; ``tmp_db`` is an in-memory database.
+    monkeypatch.setattr(LlamaGPT, "DB_PATH", str(tmp_path / "chat_history.db"))
+    conn = LlamaGPT.init_db()
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0] == 1000
+    finally:
+        conn.close()
+
+
+def test_init_db_migrates_text_timestamps(LlamaGPT, tmp_path, monkeypatch):
+    """ISO‑8601 timestamps from older databases become epoch nanoseconds."""
+    path = tmp_path / "chat_history.db"
+    old = sqlite3.connect(path)
+    old.executescript(
+        """
+        CREATE TABLE messages (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id     INTEGER,
+            user_name   TEXT,
+            channel_id  INTEGER,
+            is_dm       INTEGER,
+            role        TEXT,
+            content     TEXT,
+            timestamp   TEXT
+        );
+        INSERT INTO messages (user_id, role, content, timestamp)
+        VALUES (1, 'user', 'old', '2024-01-01T00:00:00.123456');
+        """
+    )
+    old.close()
 
-            async def json(self):
-                return {"message": {"content": "I am fine.", "thinking": "Reasoning."}}
+    monkeypatch.setattr(LlamaGPT, "DB_PATH", str(path))
+    conn = LlamaGPT.init_db()
+    try:
+        (ts,) = conn.execute("SELECT timestamp FROM messages").fetchone()
+        assert ts == 1_704_067_200_123_000_000
 
-            async def text(self):
-                return ""
+        LlamaGPT._insert_message(conn, 1, 2, False, "user", "new", "alice")
+        (newest,) = LlamaGPT.fetch_recent_messages(conn, limit=1)
+        assert newest["content"] == "new"
+    finally:
+        conn.close()
 
-        return Response()
 
-    with mock.patch(
-        "aiohttp.ClientSession.post", new=mock.AsyncMock(side_effect=fake_post)
-    ):
+@pytest.mark.asyncio(loop_scope="session")
+async def test_ollama_chat_success(LlamaGPT):
+    """`ollama_chat` joins the streamed assistant content on HTTP 200."""
+    lines = [
+        b'{"message": {"content": "", "thinking": "Reasoning."}}\n',
+        b'{"message": {"content": "I am "}}\n',
+        b"\n",
+        b'{"message": {"content": "fine."}, "done": true}\n',
+    ]
+
+    session = await LlamaGPT._get_session()
+    with _patch_post(session, 200, lines) as post:
         answer, thinking = await LlamaGPT.ollama_chat(
             [{"role": "user", "content": "Hi"}]
         )
         assert answer == "I am fine."
         assert thinking == "Reasoning."
+    assert orjson.loads(post.call_args.kwargs["data"])["stream"] is True
+    await LlamaGPT.close_session()
 
 
-@pytest.mark.asyncio
+@pytest.mark.asyncio(loop_scope="session")
 async def test_ollama_chat_error(LlamaGPT):
     """Non‑200 responses raise a RuntimeError."""
+    session = await LlamaGPT._get_session()
+    with _patch_post(session, 500, body="Server error"):
+        with pytest.raises(RuntimeError) as exc:
+            await LlamaGPT.ollama_chat([{"role": "user", "content": "Hi"}])
+        assert "Ollama error 500" in str(exc.value)
+    await LlamaGPT.close_session()
 
-    async def fake_post(*_, **__):
-        class Response:
-            status = 500
-
-            async def text(self):
-                return "Server error"
 
-        return Response()
+@pytest.mark.asyncio(loop_scope="session")
+async def test_ollama_chat_timeout(LlamaGPT):
+    """Timeouts surface as a readable error; long streams are not capped."""
+    session = await LlamaGPT._get_session()
+    assert session.timeout.total is None
+    assert session.timeout.sock_read == LlamaGPT.OLLAMA_READ_TIMEOUT
 
-    with mock.patch(
-        "aiohttp.ClientSession.post", new=mock.AsyncMock(side_effect=fake_post)
-    ):
-        with pytest.raises(RuntimeError) as exc:
+    timeout = mock.Mock(side_effect=asyncio.TimeoutError())
+    with mock.patch.object(session, "post", new=timeout):
+        with pytest.raises(RuntimeError, match="Ollama timed out"):
             await LlamaGPT.ollama_chat([{"role": "user", "content": "Hi"}])
-        assert "Ollama error 500" in str(exc.value)
+    await LlamaGPT.close_session()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_ollama_chat_reuses_session(LlamaGPT):
+    """Consecutive calls share one keep-alive HTTP session."""
+    first = await LlamaGPT._get_session()
+    second = await LlamaGPT._get_session()
+    assert first is second
+    assert first.connector.limit == 32
+
+    await LlamaGPT.close_session()
+    assert LlamaGPT._SESSION is None
+    assert first.closed
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_ollama_session_headers(LlamaGPT):
+    """Ollama requests ask for compressed bodies over a kept-alive connection."""
+    session = await LlamaGPT._get_session()
+    try:
+        assert session.headers["Accept-Encoding"] == "gzip, deflate"
+        assert session.headers["Connection"] == "keep-alive"
+        assert not session.connector.force_close
+    finally:
+        await LlamaGPT.close_session()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_ollama_chat_creates_one_session(LlamaGPT):
+    """Two ``ollama_chat`` calls construct a single ``ClientSession``."""
+    real_session = LlamaGPT.aiohttp.ClientSession
+
+    def make_session(*args, **kwargs):
+        session = real_session(*args, **kwargs)
+        session.post = mock.Mock(
+            return_value=_Response(200, (b'{"message": {"content": "ok"}}\n',))
+        )
+        return session
 
+    with mock.patch("aiohttp.ClientSession", side_effect=make_session) as session_cls:
+        for _ in range(2):
+            answer, _thinking = await LlamaGPT.ollama_chat(
+                [{"role": "user", "content": "Hi"}]
+            )
+            assert answer == "ok"
+    assert session_cls.call_count == 1
+    await LlamaGPT.close_session()
 
-@pytest.mark.asyncio
-async def test_on_message_dm_success(tmp_db, fake_message, fake_client):
-    """A DM triggers a reply and both messages are persisted."""
 
-    async def fake_ollama(messages):
-        return ("Answer text", "Thinking text")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_dm_success(tmp_db, fake_message, fake_client, monkeypatch):
+    """A DM triggers a reply and both messages are persisted."""
 
-    LlamaGPT.ollama_chat = fake_ollama
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", _ollama_ok)
 
     await LlamaGPT.on_message(fake_message)
 
@@ -288,14 +500,50 @@ async def test_on_message_dm_success(tmp_db, fake_message, fake_client):
     assert rows[0][6] == "Answer text"
 
 
-@pytest.mark.asyncio
-async def test_on_message_dm_error(tmp_db, fake_message, fake_client):
-    """If the assistant call fails, the bot sends an error to the DM."""
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_single_transaction(
+    tmp_db, fake_message, fake_client, monkeypatch
+):
+    """User, thinking and assistant rows of one turn are written in one batch."""
 
-    async def fake_ollama(messages):
-        raise RuntimeError("Something went wrong")
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", _ollama_ok)
+    insert = mock.Mock(wraps=tmp_db._insert_messages)
+    monkeypatch.setattr(tmp_db, "_insert_messages", insert)
 
-    LlamaGPT.ollama_chat = fake_ollama
+    await LlamaGPT.on_message(fake_message)
+
+    insert.assert_called_once()
+    roles = [row[4] for row in insert.call_args[0][1]]
+    assert roles == ["user", "thinking", "assistant"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_persists_off_loop(
+    tmp_db, fake_message, fake_client, monkeypatch
+):
+    """The turn is written on the database thread, not the event loop thread."""
+
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", _ollama_ok)
+    threads = []
+    insert = tmp_db._insert_messages
+
+    def recording_insert(conn, rows):
+        threads.append(threading.current_thread().name)
+        insert(conn, rows)
+
+    monkeypatch.setattr(tmp_db, "_insert_messages", recording_insert)
+
+    await LlamaGPT.on_message(fake_message)
+
+    assert threads and threads[0].startswith("chat-db")
+    fake_message.reply.assert_called_once_with("Answer text")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_dm_error(tmp_db, fake_message, fake_client, monkeypatch):
+    """If the assistant call fails, the bot sends an error to the DM."""
+
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", _ollama_boom)
 
     await LlamaGPT.on_message(fake_message)
 
@@ -305,15 +553,38 @@ async def test_on_message_dm_error(tmp_db, fake_message, fake_client):
     assert "⚠️ Error" in sent_text
 
 
-@pytest.mark.asyncio
-async def test_on_message_dm_chunks(tmp_db, fake_message, fake_client):
-    """Long assistant responses are split across reply and channel.send."""
-    long_answer = "A" * 4000  # > 2000 chars
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_dm_error_keeps_sent_part(
+    tmp_db, fake_message, fake_client, monkeypatch
+):
+    """A stream failing mid‑answer still records the part Discord shows."""
 
     async def fake_ollama(messages):
-        return (long_answer, None)
+        yield "A" * 1500 + " ", ""
+        yield "B" * 1500, ""  # pushes the A's out as the first chunk
+        raise RuntimeError("connection lost")
 
-    LlamaGPT.ollama_chat = fake_ollama
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", fake_ollama)
+    monkeypatch.setattr(LlamaGPT, "dm_histories", LlamaGPT._HistoryCache())
+
+    await LlamaGPT.on_message(fake_message)
+
+    fake_message.reply.assert_called_once_with("A" * 1500)
+    assert "connection lost" in fake_message.channel.send.call_args[0][0]
+
+    rows = tmp_db.fetch_recent_messages(tmp_db.DB_CONN, limit=5)
+    assert [(r["role"], r["content"]) for r in rows] == [
+        ("assistant", "A" * 1500),
+        ("user", fake_message.content),
+    ]
+    history = LlamaGPT.dm_histories.get(fake_message.author.id)
+    assert [m["content"] for m in history] == [fake_message.content, "A" * 1500]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_dm_chunks(tmp_db, fake_message, fake_client, monkeypatch):
+    """Long assistant responses are split across reply and channel.send."""
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", _ollama_long)
 
     await LlamaGPT.on_message(fake_message)
 
@@ -327,14 +598,109 @@ async def test_on_message_dm_chunks(tmp_db, fake_message, fake_client):
     assert len(second_chunk) == 2000
 
 
-@pytest.mark.asyncio
-async def test_on_message_public_success(tmp_db, fake_message_public, fake_client):
-    """A public message that mentions the bot triggers a reply."""
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_streams_chunks(
+    tmp_db, fake_message, fake_client, monkeypatch
+):
+    """Full chunks are sent while the model is still generating."""
+    sent_before_done = []
 
     async def fake_ollama(messages):
-        return ("Public answer", None)
+        yield "A" * 1500 + " ", ""
+        yield "B" * 1500, ""
+        sent_before_done.append(fake_message.reply.call_count)
+        yield " tail", ""
+
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", fake_ollama)
+
+    await LlamaGPT.on_message(fake_message)
+
+    assert sent_before_done == [1]
+    fake_message.reply.assert_called_once_with("A" * 1500)
+    fake_message.channel.send.assert_called_once_with("B" * 1500 + " tail")
 
-    LlamaGPT.ollama_chat = fake_ollama
+    rows = tmp_db.fetch_recent_messages(tmp_db.DB_CONN, limit=1)
+    assert rows[0][6] == "A" * 1500 + " " + "B" * 1500 + " tail"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_sends_followups_in_order(
+    tmp_db, fake_message, fake_client, monkeypatch
+):
+    """Follow-up chunks are sent one at a time, in order, after the reply."""
+    delivered = []
+    in_flight = []
+    active = 0
+
+    async def slow_send(chunk):
+        nonlocal active
+        active += 1
+        in_flight.append(active)
+        # Later chunks are faster, so concurrent sends would arrive reversed
+        await asyncio.sleep(0.01 * (ord("E") - ord(chunk[0])))
+        delivered.append(chunk[0])
+        active -= 1
+
+    fake_message.channel.send.side_effect = slow_send
+
+    async def fake_ollama(messages):
+        yield "A" * 2000 + "B" * 2000 + "C" * 2000 + "D" * 2000, ""
+
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", fake_ollama)
+
+    await LlamaGPT.on_message(fake_message)
+
+    fake_message.reply.assert_called_once_with("A" * 2000)
+    assert delivered == ["B", "C", "D"]
+    assert max(in_flight) == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_failed_send_does_not_mask_stream_error(
+    tmp_db, fake_message, fake_client, monkeypatch
+):
+    """When both a follow-up send and the stream fail, the stream error wins."""
+    fake_message.channel.send.side_effect = [RuntimeError("send failed"), None]
+
+    async def fake_ollama(messages):
+        yield "A" * 2000 + "B" * 2001, ""  # reply A, follow-up B (fails)
+        raise RuntimeError("stream failed")
+
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", fake_ollama)
+
+    await LlamaGPT.on_message(fake_message)
+
+    error_text = fake_message.channel.send.call_args[0][0]
+    assert "stream failed" in error_text
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_dm_history_not_duplicated(
+    tmp_db, fake_message, fake_client, monkeypatch
+):
+    """Each turn adds exactly one user and one assistant entry to the history."""
+
+    async def fake_ollama(messages):
+        yield f"Answer {len(list(messages))}", ""
+
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", fake_ollama)
+    monkeypatch.setattr(LlamaGPT, "dm_histories", LlamaGPT._HistoryCache())
+
+    await LlamaGPT.on_message(fake_message)
+    await LlamaGPT.on_message(fake_message)
+
+    history = LlamaGPT.dm_histories.get(fake_message.author.id)
+    assert [m["role"] for m in history] == ["user", "assistant"] * 2
+    assert history[-1]["content"] == "Answer 3"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_public_success(
+    tmp_db, fake_message_public, fake_client, monkeypatch
+):
+    """A public message that mentions the bot triggers a reply."""
+
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", _ollama_public)
 
     await LlamaGPT.on_message(fake_message_public)
 
@@ -349,7 +715,32 @@ async def test_on_message_public_success(tmp_db, fake_message_public, fake_clien
     assert rows[0][6] == "Public answer"
 
 
-@pytest.mark.asyncio
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_public_strips_mention(
+    tmp_db, fake_message_public, fake_client, monkeypatch
+):
+    """Both forms of the bot’s mention are removed from the prompt."""
+    seen = []
+
+    async def fake_ollama(messages):
+        seen.append([m["content"] for m in messages])
+        yield "Public answer", ""
+
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", fake_ollama)
+    monkeypatch.setattr(LlamaGPT, "_BOT_MENTIONS", ())
+    monkeypatch.setattr(LlamaGPT, "channel_histories", LlamaGPT._HistoryCache())
+    await LlamaGPT.on_ready()
+
+    bot_id = fake_client.user.id
+    fake_message_public.content = f"<@{bot_id}> can you help?"
+    await LlamaGPT.on_message(fake_message_public)
+    fake_message_public.content = f"<@!{bot_id}> thanks"
+    await LlamaGPT.on_message(fake_message_public)
+
+    assert seen[-1] == ["can you help?", "Public answer", "thanks"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
 async def test_on_message_public_no_mention(tmp_db, fake_message_public, fake_client):
     """If the bot is not mentioned, the message is ignored."""
     fake_message_public.mentions = []
@@ -364,14 +755,13 @@ async def test_on_message_public_no_mention(tmp_db, fake_message_public, fake_cl
     assert all(r[5] != "assistant" for r in rows)
 
 
-@pytest.mark.asyncio
-async def test_on_message_public_error(tmp_db, fake_message_public, fake_client):
+@pytest.mark.asyncio(loop_scope="session")
+async def test_on_message_public_error(
+    tmp_db, fake_message_public, fake_client, monkeypatch
+):
     """Assistant errors are sent back as a reply in public channels."""
 
-    async def fake_ollama(messages):
-        raise RuntimeError("Bad request")
-
-    LlamaGPT.ollama_chat = fake_ollama
+    monkeypatch.setattr(LlamaGPT, "ollama_stream", _ollama_boom)
 
     await LlamaGPT.on_message(fake_message_public)
 